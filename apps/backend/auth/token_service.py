@@ -3,6 +3,7 @@
 import os
 import base64
 import json
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from cryptography.fernet import Fernet
@@ -13,6 +14,13 @@ from database import get_db
 # Encryption key for tokens (should be set in environment)
 ENCRYPTION_KEY = os.getenv("TOKEN_ENCRYPTION_KEY", "")
 
+# Decrypted access tokens per (user_id, provider): (token, epoch expiry).
+# Entries are re-read from the database after ACCESS_TOKEN_TTL seconds, and
+# dropped ACCESS_TOKEN_MARGIN seconds before the token itself expires.
+ACCESS_TOKEN_CACHE: dict[tuple[str, str], tuple[str, float]] = {}
+ACCESS_TOKEN_TTL = 10 * 60
+ACCESS_TOKEN_MARGIN = 60
+
 
 def _get_fernet() -> Optional[Fernet]:
     """Get Fernet instance for encryption/decryption."""
@@ -91,6 +99,7 @@ class TokenService:
                 """, (user_id, provider, encrypted_access, encrypted_refresh, scopes_str, expires_str))
 
             conn.commit()
+            ACCESS_TOKEN_CACHE.pop((user_id, provider), None)
 
             return {
                 "user_id": user_id,
@@ -126,6 +135,44 @@ class TokenService:
 
             return token_data
 
+    @staticmethod
+    def get_access_token(user_id: str, provider: str) -> Optional[str]:
+        """Get a usable access token, cached across requests and services.
+
+        Expired Google tokens are refreshed first. Call
+        invalidate_access_token when a provider rejects the token.
+        """
+        key = (user_id, provider)
+        cached = ACCESS_TOKEN_CACHE.get(key)
+        if cached and time.time() < cached[1]:
+            return cached[0]
+
+        token_data = TokenService.get_token(user_id, provider)
+        if not token_data:
+            return None
+
+        expires_at = token_data.get("expires_at")
+        if provider == "google" and expires_at and datetime.now() > datetime.fromisoformat(expires_at):
+            if not TokenService.refresh_google_token(user_id):
+                return None
+            token_data = TokenService.get_token(user_id, provider)
+            if not token_data:
+                return None
+            expires_at = token_data.get("expires_at")
+
+        access_token = token_data.get("access_token")
+        expiry = time.time() + ACCESS_TOKEN_TTL
+        if expires_at:
+            expiry = min(expiry, datetime.fromisoformat(expires_at).timestamp() - ACCESS_TOKEN_MARGIN)
+        if access_token and expiry > time.time():
+            ACCESS_TOKEN_CACHE[key] = (access_token, expiry)
+        return access_token
+
+    @staticmethod
+    def invalidate_access_token(user_id: str, provider: str) -> None:
+        """Drop a cached access token so the next lookup reads the database."""
+        ACCESS_TOKEN_CACHE.pop((user_id, provider), None)
+
     @staticmethod
     def delete_token(user_id: str, provider: str) -> bool:
         """Delete OAuth token for a user and provider."""
@@ -136,6 +183,7 @@ class TokenService:
                 (user_id, provider)
             )
             conn.commit()
+            ACCESS_TOKEN_CACHE.pop((user_id, provider), None)
             return cursor.rowcount > 0
 
     @staticmethod
@@ -1,5 +1,6 @@
 """Database utilities for Able2Flow."""
 
+import queue
 import sqlite3
 from contextlib import contextmanager
 from pathlib import Path
@@ -7,13 +8,73 @@ from typing import Generator
 
 DB_PATH = Path(__file__).parent / "starter.db"
 
+# Idle connections kept per (database, mode). Reused connections skip the open,
+# the PRAGMA setup and the schema parse, and keep their statement and page caches.
+POOL_SIZE = 8
 
-@contextmanager
-def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """Database connection context manager."""
-    conn = sqlite3.connect(DB_PATH)
+_pools: dict[tuple[Path, bool], queue.LifoQueue[sqlite3.Connection]] = {}
+
+
+def _connect(readonly: bool) -> sqlite3.Connection:
+    # Pooled connections are handed between threads, one user at a time
+    if readonly:
+        conn = sqlite3.connect(
+            DB_PATH, cached_statements=256, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA query_only=1")
+    else:
+        conn = sqlite3.connect(DB_PATH, cached_statements=256, check_same_thread=False)
+        # Safe with WAL (set in init_db) and avoids an fsync on every commit
+        conn.execute("PRAGMA synchronous=NORMAL")
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+@contextmanager
+def _pooled(readonly: bool) -> Generator[sqlite3.Connection, None, None]:
+    pool = _pools.setdefault((Path(DB_PATH), readonly), queue.LifoQueue(POOL_SIZE))
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _connect(readonly)
     try:
         yield conn
     finally:
-        conn.close()
+        try:
+            # Uncommitted work is discarded, as closing the connection did
+            if conn.in_transaction:
+                conn.rollback()
+            pool.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            conn.close()
+
+
+@contextmanager
+def get_db() -> Generator[sqlite3.Connection, None, None]:
+    """Database connection context manager (connections are pooled)."""
+    with _pooled(readonly=False) as conn:
+        yield conn
+
+
+@contextmanager
+def get_db_readonly() -> Generator[sqlite3.Connection, None, None]:
+    """Read-only connection context manager for query paths.
+
+    Runs in autocommit mode (no implicit BEGIN/COMMIT) and refuses writes,
+    so concurrent readers never contend with writers under WAL.
+    """
+    with _pooled(readonly=True) as conn:
+        yield conn
+
+
+def close_pools() -> None:
+    """Close every pooled connection (on shutdown or after DB_PATH changes)."""
+    pools = list(_pools.values())
+    _pools.clear()
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
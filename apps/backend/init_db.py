@@ -16,6 +16,9 @@ def init_database() -> None:
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
+    # WAL is persistent: readers no longer block writers and commits need fewer fsyncs
+    cursor.execute("PRAGMA journal_mode=WAL")
+
     # Users table (Clerk integration)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS users (
@@ -72,6 +75,17 @@ def init_database() -> None:
         )
     """)
 
+    # Google Calendar incremental sync state (nextSyncToken per user calendar)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS calendar_sync_tokens (
+            user_id TEXT NOT NULL,
+            calendar_id TEXT NOT NULL,
+            sync_token TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, calendar_id)
+        )
+    """)
+
     # Projects table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS projects (
@@ -110,6 +124,7 @@ def init_database() -> None:
             due_date TEXT,
             project_id INTEGER DEFAULT 1,
             google_event_id TEXT,
+            calendar_sync_hash BLOB,
             source_incident_id INTEGER,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (column_id) REFERENCES columns(id),
@@ -130,6 +145,9 @@ def init_database() -> None:
             timestamp TEXT DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_entity_ts ON audit_log(entity_type, entity_id, timestamp DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_log(timestamp DESC, id DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_action ON audit_log(action)")
 
     # Monitors table
     cursor.execute("""
@@ -219,6 +237,7 @@ def init_database() -> None:
             points_earned INTEGER DEFAULT 0,
             tasks_completed INTEGER DEFAULT 0,
             bonus_points INTEGER DEFAULT 0,
+            total_points INTEGER GENERATED ALWAYS AS (points_earned + bonus_points) VIRTUAL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             UNIQUE(user_id, period_type, period_start)
@@ -227,6 +246,104 @@ def init_database() -> None:
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_points_period ON user_points(period_type, period_start)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_points_user ON user_points(user_id)")
 
+    # ANT HILL: Leaderboard read model (user_points joined with users, kept in sync by triggers)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS leaderboard_cache (
+            period_type TEXT NOT NULL,
+            period_start DATE NOT NULL,
+            user_id TEXT NOT NULL,
+            user_name TEXT,
+            user_email TEXT,
+            avatar_url TEXT,
+            points_earned INTEGER DEFAULT 0,
+            tasks_completed INTEGER DEFAULT 0,
+            bonus_points INTEGER DEFAULT 0,
+            total_points INTEGER DEFAULT 0,
+            PRIMARY KEY (period_type, period_start, user_id)
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_leaderboard_cache_rank "
+        "ON leaderboard_cache(period_type, period_start, total_points DESC)"
+    )
+    for event in ("INSERT", "UPDATE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_user_points_{event.lower()}_leaderboard
+            AFTER {event} ON user_points
+            BEGIN
+                INSERT INTO leaderboard_cache
+                    (period_type, period_start, user_id, user_name, user_email, avatar_url,
+                     points_earned, tasks_completed, bonus_points, total_points)
+                SELECT NEW.period_type, NEW.period_start, NEW.user_id, u.name, u.email, u.avatar_url,
+                       NEW.points_earned, NEW.tasks_completed, NEW.bonus_points,
+                       NEW.points_earned + NEW.bonus_points
+                FROM users u WHERE u.id = NEW.user_id
+                ON CONFLICT (period_type, period_start, user_id) DO UPDATE SET
+                    user_name = excluded.user_name,
+                    user_email = excluded.user_email,
+                    avatar_url = excluded.avatar_url,
+                    points_earned = excluded.points_earned,
+                    tasks_completed = excluded.tasks_completed,
+                    bonus_points = excluded.bonus_points,
+                    total_points = excluded.total_points;
+            END
+        """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_user_points_delete_leaderboard
+        AFTER DELETE ON user_points
+        BEGIN
+            DELETE FROM leaderboard_cache
+            WHERE period_type = OLD.period_type AND period_start = OLD.period_start AND user_id = OLD.user_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_insert_leaderboard
+        AFTER INSERT ON users
+        BEGIN
+            INSERT INTO leaderboard_cache
+                (period_type, period_start, user_id, user_name, user_email, avatar_url,
+                 points_earned, tasks_completed, bonus_points, total_points)
+            SELECT up.period_type, up.period_start, up.user_id, NEW.name, NEW.email, NEW.avatar_url,
+                   up.points_earned, up.tasks_completed, up.bonus_points,
+                   up.points_earned + up.bonus_points
+            FROM user_points up WHERE up.user_id = NEW.id
+            ON CONFLICT (period_type, period_start, user_id) DO UPDATE SET
+                user_name = excluded.user_name,
+                user_email = excluded.user_email,
+                avatar_url = excluded.avatar_url,
+                points_earned = excluded.points_earned,
+                tasks_completed = excluded.tasks_completed,
+                bonus_points = excluded.bonus_points,
+                total_points = excluded.total_points;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_update_leaderboard
+        AFTER UPDATE OF name, email, avatar_url ON users
+        BEGIN
+            UPDATE leaderboard_cache
+            SET user_name = NEW.name, user_email = NEW.email, avatar_url = NEW.avatar_url
+            WHERE user_id = NEW.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_delete_leaderboard
+        AFTER DELETE ON users
+        BEGIN
+            DELETE FROM leaderboard_cache WHERE user_id = OLD.id;
+        END
+    """)
+    # Backfill rows written before the triggers existed
+    cursor.execute("""
+        INSERT OR IGNORE INTO leaderboard_cache
+            (period_type, period_start, user_id, user_name, user_email, avatar_url,
+             points_earned, tasks_completed, bonus_points, total_points)
+        SELECT up.period_type, up.period_start, up.user_id, u.name, u.email, u.avatar_url,
+               up.points_earned, up.tasks_completed, up.bonus_points,
+               up.points_earned + up.bonus_points
+        FROM user_points up JOIN users u ON up.user_id = u.id
+    """)
+
     # ANT HILL: Task comments
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS task_comments (
@@ -266,6 +383,9 @@ def init_database() -> None:
     if SEED_DATA:
         _seed_data(cursor)
 
+    # Refresh planner statistics for tables whose indexes changed
+    cursor.execute("PRAGMA optimize")
+
     conn.commit()
     conn.close()
     logger.info("Database initialized at %s", DB_PATH)
@@ -342,6 +462,13 @@ def _run_migrations(cursor) -> None:
     except sqlite3.OperationalError:
         pass
 
+    # Digest of the event last pushed to Google Calendar
+    try:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN calendar_sync_hash BLOB")
+        logger.info("Migration: Added calendar_sync_hash column")
+    except sqlite3.OperationalError:
+        pass
+
     # Add source_incident_id column if missing
     try:
         cursor.execute("ALTER TABLE tasks ADD COLUMN source_incident_id INTEGER REFERENCES incidents(id)")
@@ -414,6 +541,55 @@ def _run_migrations(cursor) -> None:
     except sqlite3.OperationalError:
         pass
 
+    # Calendar sync scans: synced tasks (partial index), per-project task lists,
+    # and a project's columns by position (board listing, done-column lookup).
+    # idx_tasks_project_stats also covers the digest's per-project task counts
+    # and supersedes the earlier single-column idx_tasks_project.
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tasks_google_event "
+        "ON tasks(project_id, google_event_id) WHERE google_event_id IS NOT NULL"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tasks_project_stats ON tasks(project_id, completed, due_date)"
+    )
+    cursor.execute("DROP INDEX IF EXISTS idx_tasks_project")
+    # Open-incident counts, overall or per project
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents(status, project_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_columns_project ON columns(project_id, position)")
+
+    # One settings row per user, integration and project (NULL = user-wide), so
+    # saves can UPSERT. Duplicates are dropped first, keeping the row reads used.
+    cursor.execute("""
+        DELETE FROM integration_settings WHERE id NOT IN (
+            SELECT MIN(id) FROM integration_settings
+            GROUP BY user_id, integration_type, COALESCE(project_id, -1)
+        )
+    """)
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_integration_settings_scope "
+        "ON integration_settings(user_id, integration_type, COALESCE(project_id, -1))"
+    )
+
+    # Generated total so leaderboard ordering can be served from an index.
+    # ALTER TABLE cannot add STORED columns; the index materializes the value.
+    try:
+        cursor.execute(
+            "ALTER TABLE user_points ADD COLUMN total_points INTEGER "
+            "GENERATED ALWAYS AS (points_earned + bonus_points) VIRTUAL"
+        )
+        logger.info("Migration: Added total_points column to user_points")
+    except sqlite3.OperationalError as e:
+        # Present in tables created by CREATE TABLE above; anything else
+        # (e.g. generated columns unsupported) must not go unnoticed
+        if "duplicate column" not in str(e):
+            logger.error("Migration: Could not add total_points to user_points: %s", e)
+            raise
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_up_leaderboard "
+        "ON user_points(period_type, period_start, total_points DESC)"
+    )
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -1,8 +1,11 @@
 """Able2Flow MVP - Task management + Monitoring/Incident response API."""
 
 import asyncio
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from contextlib import asynccontextmanager
 
 from pathlib import Path
@@ -15,16 +18,30 @@ load_dotenv(env_path, override=True)
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Configure logging: records are queued and written by a listener thread,
+# so a slow stderr never blocks the event loop
+LOG_QUEUE: queue.SimpleQueue = queue.SimpleQueue()
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(
+    logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 )
+log_listener = logging.handlers.QueueListener(LOG_QUEUE, log_handler)
+queue_handler = logging.handlers.QueueHandler(LOG_QUEUE)
+# Message-only here; the listener's handler applies the full format
+queue_handler.setFormatter(logging.Formatter())
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+log_listener.start()
+# Flush queued records at interpreter exit
+atexit.register(log_listener.stop)
 
 from routers import tasks, columns, monitors, incidents, audit, dashboard, ai, sla, events, projects, attachments
 from routers import gamification, time_tracking, comments, notifications  # ANT HILL routers
 from routers.integrations import calendar_router, docs_router, gmail_router, slack_router, oauth_router
 from services.monitor_service import monitor_service
+from services.notification_service import notification_queue
+from services.integrations.http_client import close_client
+from services.event_store import table_columns
+from database import close_pools
 
 
 @asynccontextmanager
@@ -42,7 +59,11 @@ async def lifespan(app: FastAPI):
     # Shutdown: Stop background tasks and close connections
     monitor_service.stop_background_checks()
     task.cancel()
+    notification_queue.flush()
     await monitor_service.close()
+    await close_client()
+    close_pools()
+    table_columns.cache_clear()
 
 
 app = FastAPI(
@@ -1,6 +1,10 @@
 """AI-powered features router."""
 
+from collections.abc import AsyncIterator
+
+import msgspec
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from database import get_db
 from services.ai_triage_service import ai_triage
@@ -42,6 +46,41 @@ async def analyze_incident(
     return analysis
 
 
+@router.post("/incidents/{incident_id}/analyze/stream")
+async def analyze_incident_stream(
+    incident_id: int,
+    lang: str = Query("en", description="Response language: 'en' or 'cs'")
+) -> StreamingResponse:
+    """Streaming variant of incident analysis (Server-Sent Events).
+
+    Emits `delta` events with generated text, a `severity` event as soon
+    as the severity suggestion is known, and a final `result` event with
+    the same payload as the non-streaming endpoint.
+
+    Query params:
+        lang: Response language ('en' for English, 'cs' for Czech)
+    """
+    with get_db() as conn:
+        cursor = conn.execute(
+            "SELECT * FROM incidents WHERE id = ?", (incident_id,)
+        )
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Incident not found")
+
+    async def event_source() -> AsyncIterator[bytes]:
+        async for event in ai_triage.analyze_incident_stream(incident_id, language=lang):
+            if event["type"] == "result":
+                audit_service.log_action(
+                    "incident",
+                    incident_id,
+                    "ai_analyze",
+                    new_value={"analysis_result": event["analysis"].get("severity_suggestion")},
+                )
+            yield b"event: %s\ndata: %s\n\n" % (event["type"].encode(), msgspec.json.encode(event))
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+
 @router.get("/incidents/{incident_id}/runbook")
 async def get_runbook_suggestion(incident_id: int) -> dict:
     """Get suggested runbook for incident type."""
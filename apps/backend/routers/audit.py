@@ -13,13 +13,21 @@ def list_audit_logs(
     entity_id: int | None = None,
     limit: int = 100,
     offset: int = 0,
+    before_timestamp: str | None = None,
+    before_id: int | None = None,
 ) -> list[dict]:
-    """Get audit logs with optional filtering."""
+    """Get audit logs with optional filtering.
+
+    For paging, pass the `timestamp` and `id` of the last entry received
+    as `before_timestamp` and `before_id`.
+    """
+    before = (before_timestamp, before_id) if before_timestamp and before_id else None
     return audit_service.get_audit_logs(
         entity_type=entity_type,
         entity_id=entity_id,
         limit=limit,
         offset=offset,
+        before=before,
     )
 
 
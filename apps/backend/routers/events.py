@@ -11,13 +11,16 @@ router = APIRouter(prefix="/api/events", tags=["events"])
 def get_activity_feed(
     limit: int = Query(50, le=200),
     entity_types: str | None = Query(None, description="Comma-separated: task,incident,monitor"),
+    before_timestamp: str | None = Query(None, description="Cursor: timestamp of the last item received"),
+    before_id: int | None = Query(None, description="Cursor: id of the last item received"),
 ) -> list[dict]:
     """Get activity feed across all entities.
 
     Real-time feed of all system changes.
     """
     types = entity_types.split(",") if entity_types else None
-    return event_store.get_activity_feed(limit=limit, entity_types=types)
+    before = (before_timestamp, before_id) if before_timestamp and before_id else None
+    return event_store.get_activity_feed(limit=limit, entity_types=types, before=before)
 
 
 @router.get("/{entity_type}/{entity_id}/history")
@@ -22,6 +22,7 @@ class NotifyIncidentRequest(BaseModel):
     """Request to notify about an incident."""
     channel: str
     incident_id: int
+    compact: bool = False
 
 
 class NotifyTaskRequest(BaseModel):
@@ -93,6 +94,7 @@ async def notify_incident(
     result = await service.send_incident_notification(
         channel=request.channel,
         incident=dict(incident),
+        compact=request.compact,
     )
 
     if not result:
@@ -1,12 +1,138 @@
 """AI-powered incident triage using Claude API."""
 
+import asyncio
+import json
+import logging
 import os
-from datetime import datetime
+import re
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any
 
 import httpx
+import msgspec
+
+from database import get_db, get_db_readonly
+
+logger = logging.getLogger(__name__)
+
+# Claude analyses are reused while the incident row is unchanged
+ANALYSIS_CACHE_TTL = 300  # seconds
+ANALYSIS_CACHE_SIZE = 1000
+
+# Static parts of the incident analysis prompt (role + language instruction, JSON schema)
+ANALYSIS_PROMPT_HEADERS = {
+    "en": (
+        "You are an expert SRE analyzing an incident. Provide actionable insights.\n\n"
+        "Respond in English.\n\n"
+    ),
+    "cs": (
+        "Jsi expert SRE analyzující incident. Poskytni praktické poznatky.\n\n"
+        "DŮLEŽITÉ: Odpověz v češtině. Všechny texty v JSON musí být česky.\n\n"
+    ),
+}
+ANALYSIS_PROMPT_FOOTER = """Analyze this incident and respond in JSON format:
+{
+    "severity_suggestion": "critical|warning|info",
+    "confidence": 0.0-1.0,
+    "root_cause_hypothesis": ["possible cause 1", "possible cause 2"],
+    "recommended_actions": ["action 1", "action 2", "action 3"],
+    "estimated_impact": "description of business impact",
+    "runbook_suggestion": "link or name of relevant runbook if known"
+}
+
+Be concise and actionable."""
+
+# Closes the messages array opened by message_body_prefix()
+MESSAGE_BODY_SUFFIX = b"}]}"
+
+# Decodes the first JSON object embedded in Claude's text response
+JSON_DECODER = json.JSONDecoder()
+
+# Fallback extractors for task suggestions when Claude returns malformed JSON
+TITLE_PATTERN = re.compile(r'"title"\s*:\s*"([^"]+)"')
+DESCRIPTION_PATTERN = re.compile(r'"description"\s*:\s*"([^"]*(?:\\.[^"]*)*)"', re.DOTALL)
+PRIORITY_PATTERN = re.compile(r'"priority"\s*:\s*"(high|medium|low)"')
+
+# Lets the streaming analysis surface severity before the full JSON closes
+SEVERITY_PATTERN = re.compile(r'"severity_suggestion"\s*:\s*"(critical|warning|info)"')
+
+# Rule-based analysis texts used when Claude is unavailable
+FALLBACK_TEXTS = {
+    "en": {
+        "actions": ("Check service logs", "Verify network connectivity"),
+        "hypothesis": ("Service unreachable", "Network issues", "Resource exhaustion"),
+        "impact": "Unknown - manual assessment required",
+        "escalate": "Service has multiple failures - escalate immediately",
+    },
+    "cs": {
+        "actions": ("Zkontrolovat logy služby", "Ověřit síťové připojení"),
+        "hypothesis": ("Služba nedostupná", "Problémy se sítí", "Vyčerpání prostředků"),
+        "impact": "Neznámé - nutné ruční posouzení",
+        "escalate": "Služba má opakované selhání - eskalujte okamžitě",
+    },
+}
+
+# Pre-defined runbooks based on incident patterns
+RUNBOOKS = {
+    "timeout": {
+        "name": "Service Timeout Runbook",
+        "steps": [
+            "1. Check service health endpoint directly",
+            "2. Review recent deployments in audit log",
+            "3. Check resource utilization (CPU, memory)",
+            "4. Review application logs for errors",
+            "5. If persists > 5min, restart service",
+            "6. If restart fails, rollback last deployment",
+        ],
+    },
+    "connection": {
+        "name": "Connection Failure Runbook",
+        "steps": [
+            "1. Verify DNS resolution",
+            "2. Check firewall rules",
+            "3. Test network path with traceroute",
+            "4. Verify SSL certificate validity",
+            "5. Check load balancer health",
+        ],
+    },
+    "default": {
+        "name": "General Incident Runbook",
+        "steps": [
+            "1. Acknowledge incident",
+            "2. Assess impact scope",
+            "3. Check monitoring dashboard",
+            "4. Review recent changes in audit log",
+            "5. Engage relevant team if needed",
+            "6. Document findings",
+        ],
+    },
+}
+
+# Incident title keyword -> runbook key, in priority order (first match wins)
+RUNBOOK_KEYWORDS = {
+    "timeout": "timeout",
+    "connection": "connection",
+    "refused": "connection",
+}
+RUNBOOK_KEYWORD_PATTERN = re.compile("|".join(map(re.escape, RUNBOOK_KEYWORDS)))
 
-from database import get_db
+
+@lru_cache(maxsize=16)
+def message_body_prefix(model: str, max_tokens: int, stream: bool = False) -> bytes:
+    """Pre-encoded Messages API body up to the user prompt string."""
+    return b'{"model":%s,"max_tokens":%d,%s"messages":[{"role":"user","content":' % (
+        msgspec.json.encode(model),
+        max_tokens,
+        b'"stream":true,' if stream else b"",
+    )
+
+
+class StreamError(Exception):
+    """Claude reported an error (e.g. overloaded_error) inside a message stream."""
 
 
 class AITriageService:
@@ -15,12 +141,25 @@ class AITriageService:
     def __init__(self):
         self.model = "claude-3-5-haiku-20241022"  # Haiku 3.5 - fast & smart
         self.base_url = "https://api.anthropic.com/v1/messages"
+        # (incident_id, language, incident fingerprint) -> (stored_at, analysis)
+        self._analysis_cache: OrderedDict[tuple, tuple[float, dict[str, Any]]] = OrderedDict()
+        # Cache key -> analysis currently running, shared by concurrent callers
+        # that saw the same incident state
+        self._inflight: dict[tuple, asyncio.Task] = {}
 
     @property
     def api_key(self) -> str | None:
         """Get API key at request time (not cached at init)."""
         return os.getenv("ANTHROPIC_API_KEY")
 
+    def _message_body(self, prompt: str, max_tokens: int, stream: bool = False) -> bytes:
+        """Encode a single-prompt Messages API request body."""
+        return (
+            message_body_prefix(self.model, max_tokens, stream)
+            + msgspec.json.encode(prompt)
+            + MESSAGE_BODY_SUFFIX
+        )
+
     async def analyze_incident(self, incident_id: int, language: str = "en") -> dict[str, Any]:
         """Analyze incident and provide AI recommendations.
 
@@ -34,7 +173,60 @@ class AITriageService:
             - recommended_actions: Step-by-step remediation
             - similar_incidents: Related past incidents
             - estimated_impact: Business impact assessment
+
+        AI results are cached for ANALYSIS_CACHE_TTL seconds as long as the
+        incident's title, status, severity and timestamps stay the same and
+        its monitor has recorded no new metric. A cached result carries the
+        time of the original analysis in "cached_at"; newer audit log entries
+        and resolved incidents are only picked up once the entry expires.
+        Concurrent calls for the same incident share a single Claude request.
         """
+        cache_key = await asyncio.to_thread(self._analysis_cache_key, incident_id, language)
+        cached = self._analysis_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < ANALYSIS_CACHE_TTL:
+            self._analysis_cache.move_to_end(cache_key)
+            analysis = cached[1]
+            return {
+                **analysis,
+                "cached": True,
+                "cached_at": analysis["analyzed_at"],
+                "analyzed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }
+
+        # Keyed like the cache: a caller arriving after the incident changed
+        # starts a new analysis instead of joining (and caching) a stale one
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._analyze_uncached(incident_id, language))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        # Shield so one caller disconnecting doesn't cancel the others' result
+        analysis = await asyncio.shield(task)
+
+        if analysis.get("ai_powered"):
+            self._analysis_cache[cache_key] = (time.monotonic(), analysis)
+            self._analysis_cache.move_to_end(cache_key)
+            while len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.popitem(last=False)
+
+        return analysis
+
+    def _analysis_cache_key(self, incident_id: int, language: str) -> tuple:
+        """Build a cache key that changes whenever the incident is updated
+        or its monitor records a new metric."""
+        with get_db_readonly() as conn:
+            row = conn.execute(
+                """
+                SELECT title, status, severity, started_at, acknowledged_at, resolved_at,
+                       (SELECT MAX(id) FROM metrics WHERE monitor_id = incidents.monitor_id)
+                FROM incidents WHERE id = ?
+                """,
+                (incident_id,),
+            ).fetchone()
+        return (incident_id, language, tuple(row) if row else None)
+
+    async def _analyze_uncached(self, incident_id: int, language: str) -> dict[str, Any]:
+        """Run the full gather + Claude analysis pipeline."""
         # Gather context
         context = await self._gather_incident_context(incident_id)
 
@@ -52,23 +244,93 @@ class AITriageService:
                         "anthropic-version": "2023-06-01",
                         "content-type": "application/json",
                     },
-                    json={
-                        "model": self.model,
-                        "max_tokens": 1024,
-                        "messages": [{"role": "user", "content": prompt}],
-                    },
+                    content=self._message_body(prompt, max_tokens=1024),
                     timeout=30.0,
                 )
                 response.raise_for_status()
-                result = response.json()
+                result = msgspec.json.decode(response.content)
                 return self._parse_ai_response(result, context)
         except Exception as e:
             return {
                 "error": str(e),
                 "fallback": True,
-                **self._fallback_analysis(context),
+                **self._fallback_analysis(context, language),
             }
 
+    async def analyze_incident_stream(
+        self, incident_id: int, language: str = "en"
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Analyze incident, yielding events while Claude generates the answer.
+
+        Yields:
+            - {"type": "delta", "text": ...} for every generated text chunk
+            - {"type": "severity", "severity_suggestion": ...} as soon as the
+              severity field is complete
+            - {"type": "result", "analysis": {...}} once, at the end; the
+              rule-based fallback if the request fails or Claude sends an
+              error event
+        """
+        context = await self._gather_incident_context(incident_id)
+
+        if not self.api_key:
+            yield {"type": "result", "analysis": self._fallback_analysis(context, language)}
+            return
+
+        prompt = self._build_analysis_prompt(context, language)
+        chunks: list[str] = []
+        severity_sent = False
+
+        try:
+            async with httpx.AsyncClient() as client:
+                async with client.stream(
+                    "POST",
+                    self.base_url,
+                    headers={
+                        "x-api-key": self.api_key,
+                        "anthropic-version": "2023-06-01",
+                        "content-type": "application/json",
+                    },
+                    content=self._message_body(prompt, max_tokens=1024, stream=True),
+                    timeout=30.0,
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        event = msgspec.json.decode(line[5:])
+                        if event.get("type") == "error":
+                            # Sent mid-stream with a 200 status; the message ends here
+                            error = event.get("error", {})
+                            raise StreamError(f"{error.get('type')}: {error.get('message')}")
+                        if event.get("type") != "content_block_delta":
+                            continue
+                        text = event["delta"].get("text", "")
+                        if not text:
+                            continue
+
+                        chunks.append(text)
+                        yield {"type": "delta", "text": text}
+
+                        if not severity_sent:
+                            match = SEVERITY_PATTERN.search("".join(chunks))
+                            if match:
+                                severity_sent = True
+                                yield {"type": "severity", "severity_suggestion": match.group(1)}
+        except Exception as e:
+            yield {
+                "type": "result",
+                "analysis": {
+                    "error": str(e),
+                    "fallback": True,
+                    **self._fallback_analysis(context, language),
+                },
+            }
+            return
+
+        # Reuse the non-streaming parser on the reassembled message
+        response_body = {"content": [{"text": "".join(chunks)}]}
+        yield {"type": "result", "analysis": self._parse_ai_response(response_body, context)}
+
     async def _gather_incident_context(self, incident_id: int) -> dict[str, Any]:
         """Gather all relevant context for incident analysis."""
         with get_db() as conn:
@@ -91,17 +353,28 @@ class AITriageService:
 
             # Get recent metrics for the monitor
             metrics = []
+            down_count = 0
             if monitor:
+                # (timestamp, is_up, response_time_ms, status_code) tuples,
+                # with the number of failed checks counted by SQLite
                 cursor = conn.execute(
                     """
-                    SELECT * FROM metrics
-                    WHERE monitor_id = ?
+                    SELECT timestamp, is_up, response_time_ms, status_code,
+                           SUM(CASE WHEN is_up = 0 THEN 1 ELSE 0 END) OVER () AS down_count
+                    FROM (
+                        SELECT * FROM metrics
+                        WHERE monitor_id = ?
+                        ORDER BY timestamp DESC
+                        LIMIT 10
+                    )
                     ORDER BY timestamp DESC
-                    LIMIT 10
                     """,
                     (monitor["id"],),
                 )
-                metrics = [dict(row) for row in cursor.fetchall()]
+                rows = cursor.fetchall()
+                metrics = [tuple(row)[:4] for row in rows]
+                if rows:
+                    down_count = rows[0]["down_count"]
 
             # Get similar past incidents
             cursor = conn.execute(
@@ -130,6 +403,7 @@ class AITriageService:
             "incident": incident,
             "monitor": monitor,
             "recent_metrics": metrics,
+            "down_count": down_count,
             "past_incidents": past_incidents,
             "recent_changes": recent_changes,
         }
@@ -140,67 +414,47 @@ class AITriageService:
         monitor = context.get("monitor")
         metrics = context.get("recent_metrics", [])
 
-        # Language-specific instructions
-        if language == "cs":
-            lang_instruction = "DŮLEŽITÉ: Odpověz v češtině. Všechny texty v JSON musí být česky."
-            role_desc = "Jsi expert SRE analyzující incident. Poskytni praktické poznatky."
-        else:
-            lang_instruction = "Respond in English."
-            role_desc = "You are an expert SRE analyzing an incident. Provide actionable insights."
+        parts = [
+            ANALYSIS_PROMPT_HEADERS.get(language, ANALYSIS_PROMPT_HEADERS["en"]),
+            "INCIDENT:\n",
+            f"- Title: {incident['title']}\n",
+            f"- Severity: {incident['severity']}\n",
+            f"- Status: {incident['status']}\n",
+            f"- Started: {incident['started_at']}\n\n",
+        ]
 
-        prompt = f"""{role_desc}
-
-{lang_instruction}
-
-INCIDENT:
-- Title: {incident['title']}
-- Severity: {incident['severity']}
-- Status: {incident['status']}
-- Started: {incident['started_at']}
-
-"""
         if monitor:
-            prompt += f"""AFFECTED SERVICE:
-- Name: {monitor['name']}
-- URL: {monitor['url']}
-- Last Status: {monitor['last_status']}
-
-"""
+            parts.append(
+                f"AFFECTED SERVICE:\n"
+                f"- Name: {monitor['name']}\n"
+                f"- URL: {monitor['url']}\n"
+                f"- Last Status: {monitor['last_status']}\n\n"
+            )
 
         if metrics:
-            prompt += "RECENT METRICS:\n"
-            for m in metrics[:5]:
-                status = "UP" if m.get("is_up") else "DOWN"
-                prompt += f"- {m['timestamp']}: {status}, {m.get('response_time_ms', 'N/A')}ms, HTTP {m.get('status_code', 'N/A')}\n"
-            prompt += "\n"
-
-        prompt += """Analyze this incident and respond in JSON format:
-{
-    "severity_suggestion": "critical|warning|info",
-    "confidence": 0.0-1.0,
-    "root_cause_hypothesis": ["possible cause 1", "possible cause 2"],
-    "recommended_actions": ["action 1", "action 2", "action 3"],
-    "estimated_impact": "description of business impact",
-    "runbook_suggestion": "link or name of relevant runbook if known"
-}
+            parts.append("RECENT METRICS:\n")
+            parts.extend(
+                f"- {timestamp}: {'UP' if is_up else 'DOWN'}, "
+                f"{'N/A' if response_time_ms is None else response_time_ms}ms, "
+                f"HTTP {'N/A' if status_code is None else status_code}\n"
+                for timestamp, is_up, response_time_ms, status_code in metrics[:5]
+            )
+            parts.append("\n")
 
-Be concise and actionable."""
+        parts.append(ANALYSIS_PROMPT_FOOTER)
 
-        return prompt
+        return "".join(parts)
 
     def _parse_ai_response(
         self, response: dict, context: dict[str, Any]
     ) -> dict[str, Any]:
         """Parse AI response and enrich with metadata."""
-        import json
-
         try:
             content = response["content"][0]["text"]
             # Try to extract JSON from response
-            if "{" in content and "}" in content:
-                json_start = content.index("{")
-                json_end = content.rindex("}") + 1
-                analysis = json.loads(content[json_start:json_end])
+            json_start = content.find("{")
+            if json_start >= 0:
+                analysis, _ = JSON_DECODER.raw_decode(content, json_start)
             else:
                 analysis = {"raw_response": content}
         except (json.JSONDecodeError, KeyError, IndexError):
@@ -209,7 +463,7 @@ Be concise and actionable."""
         return {
             "ai_powered": True,
             "model": self.model,
-            "analyzed_at": datetime.now().isoformat(),
+            "analyzed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
             "incident_id": context["incident"]["id"],
             **analysis,
         }
@@ -217,45 +471,25 @@ Be concise and actionable."""
     def _fallback_analysis(self, context: dict[str, Any], language: str = "en") -> dict[str, Any]:
         """Rule-based fallback when AI is unavailable."""
         incident = context["incident"]
-        metrics = context.get("recent_metrics", [])
 
         # Simple heuristics
         severity = incident.get("severity", "warning")
 
-        # Language-specific fallback texts
-        if language == "cs":
-            actions = ["Zkontrolovat logy služby", "Ověřit síťové připojení"]
-            hypothesis = [
-                "Služba nedostupná",
-                "Problémy se sítí",
-                "Vyčerpání prostředků",
-            ]
-            impact = "Neznámé - nutné ruční posouzení"
-            escalate_msg = "Služba má opakované selhání - eskalujte okamžitě"
-        else:
-            actions = ["Check service logs", "Verify network connectivity"]
-            hypothesis = [
-                "Service unreachable",
-                "Network issues",
-                "Resource exhaustion",
-            ]
-            impact = "Unknown - manual assessment required"
-            escalate_msg = "Service has multiple failures - escalate immediately"
+        texts = FALLBACK_TEXTS.get(language, FALLBACK_TEXTS["en"])
+        actions = list(texts["actions"])
 
-        if metrics:
-            down_count = sum(1 for m in metrics if not m.get("is_up"))
-            if down_count > 3:
-                severity = "critical"
-                actions.insert(0, escalate_msg)
+        if context.get("down_count", 0) > 3:
+            severity = "critical"
+            actions.insert(0, texts["escalate"])
 
         return {
             "ai_powered": False,
             "severity_suggestion": severity,
             "confidence": 0.5,
-            "root_cause_hypothesis": hypothesis,
+            "root_cause_hypothesis": list(texts["hypothesis"]),
             "recommended_actions": actions,
-            "estimated_impact": impact,
-            "analyzed_at": datetime.now().isoformat(),
+            "estimated_impact": texts["impact"],
+            "analyzed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
             "incident_id": incident["id"],
         }
 
@@ -264,49 +498,9 @@ Be concise and actionable."""
         context = await self._gather_incident_context(incident_id)
         incident = context["incident"]
 
-        # Pre-defined runbooks based on incident patterns
-        runbooks = {
-            "timeout": {
-                "name": "Service Timeout Runbook",
-                "steps": [
-                    "1. Check service health endpoint directly",
-                    "2. Review recent deployments in audit log",
-                    "3. Check resource utilization (CPU, memory)",
-                    "4. Review application logs for errors",
-                    "5. If persists > 5min, restart service",
-                    "6. If restart fails, rollback last deployment",
-                ],
-            },
-            "connection": {
-                "name": "Connection Failure Runbook",
-                "steps": [
-                    "1. Verify DNS resolution",
-                    "2. Check firewall rules",
-                    "3. Test network path with traceroute",
-                    "4. Verify SSL certificate validity",
-                    "5. Check load balancer health",
-                ],
-            },
-            "default": {
-                "name": "General Incident Runbook",
-                "steps": [
-                    "1. Acknowledge incident",
-                    "2. Assess impact scope",
-                    "3. Check monitoring dashboard",
-                    "4. Review recent changes in audit log",
-                    "5. Engage relevant team if needed",
-                    "6. Document findings",
-                ],
-            },
-        }
-
-        title_lower = incident["title"].lower()
-        if "timeout" in title_lower:
-            runbook = runbooks["timeout"]
-        elif "connection" in title_lower or "refused" in title_lower:
-            runbook = runbooks["connection"]
-        else:
-            runbook = runbooks["default"]
+        matched = set(RUNBOOK_KEYWORD_PATTERN.findall(incident["title"].lower()))
+        keyword = next((kw for kw in RUNBOOK_KEYWORDS if kw in matched), None)
+        runbook = RUNBOOKS[RUNBOOK_KEYWORDS[keyword] if keyword else "default"]
 
         return {
             "incident_id": incident_id,
@@ -373,27 +567,18 @@ Be specific and actionable."""
                         "anthropic-version": "2023-06-01",
                         "content-type": "application/json",
                     },
-                    json={
-                        "model": self.model,
-                        "max_tokens": 512,
-                        "messages": [{"role": "user", "content": prompt}],
-                    },
+                    content=self._message_body(prompt, max_tokens=512),
                     timeout=30.0,
                 )
                 response.raise_for_status()
-                result = response.json()
-
-                import json
-                import re
+                result = msgspec.json.decode(response.content)
                 content = result["content"][0]["text"]
 
                 # Try to parse JSON from response
                 try:
-                    if "{" in content and "}" in content:
-                        json_start = content.index("{")
-                        json_end = content.rindex("}") + 1
-                        json_str = content[json_start:json_end]
-                        suggestion = json.loads(json_str)
+                    json_start = content.find("{")
+                    if json_start >= 0:
+                        suggestion, _ = JSON_DECODER.raw_decode(content, json_start)
                         suggestion["ai_generated"] = True
                         suggestion["incident_id"] = incident_id
                         return suggestion
@@ -401,9 +586,9 @@ Be specific and actionable."""
                     pass
 
                 # Fallback: extract values using regex
-                title_match = re.search(r'"title"\s*:\s*"([^"]+)"', content)
-                desc_match = re.search(r'"description"\s*:\s*"([^"]*(?:\\.[^"]*)*)"', content, re.DOTALL)
-                priority_match = re.search(r'"priority"\s*:\s*"(high|medium|low)"', content)
+                title_match = TITLE_PATTERN.search(content)
+                desc_match = DESCRIPTION_PATTERN.search(content)
+                priority_match = PRIORITY_PATTERN.search(content)
 
                 if title_match:
                     return {
@@ -415,8 +600,7 @@ Be specific and actionable."""
                     }
 
         except Exception as e:
-            import logging
-            logging.error(f"AI task suggestion failed: {e}")
+            logger.error("AI task suggestion failed: %s", e)
             # Fall through to fallback
 
         # Fallback
@@ -1,11 +1,52 @@
 """Audit service for tracking all entity changes."""
 
-import json
 import sqlite3
 from datetime import datetime
+from functools import lru_cache
 from typing import Any
 
-from database import get_db
+import msgspec
+
+from database import get_db, get_db_readonly
+
+# Kept as constants so every call hits the connection's prepared-statement cache
+INSERT_AUDIT_SQL = """
+    INSERT INTO audit_log (entity_type, entity_id, action, old_value, new_value, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+# json_extract returns nested objects as JSON text, matching dump_value()
+INSERT_AUDIT_BULK_SQL = """
+    INSERT INTO audit_log (entity_type, entity_id, action, old_value, new_value, timestamp)
+    SELECT
+        json_extract(value, '$.entity_type'),
+        json_extract(value, '$.entity_id'),
+        json_extract(value, '$.action'),
+        json_extract(value, '$.old_value'),
+        json_extract(value, '$.new_value'),
+        json_extract(value, '$.timestamp')
+    FROM json_each(?)
+"""
+# Explicit column order so rows can be read positionally (see audit_entry)
+AUDIT_COLUMNS = ("id", "entity_type", "entity_id", "action", "old_value", "new_value", "timestamp")
+SELECT_AUDIT_SQL = f"SELECT {', '.join(AUDIT_COLUMNS)} FROM audit_log"
+
+
+def dump_value(value: dict[str, Any] | None) -> str | None:
+    """Serialize an entity snapshot for the audit_log old_value/new_value columns."""
+    # Stored as TEXT (not BLOB) so SQLite's JSON1 functions keep working on it;
+    # MessagePack would only save ~10% on a typical task snapshot
+    return msgspec.json.encode(value).decode() if value else None
+
+
+def load_value(raw: str | None) -> Any:
+    """Deserialize an audit_log old_value/new_value column."""
+    return msgspec.json.decode(raw) if raw else None
+
+
+def audit_entry(row: tuple) -> dict[str, Any]:
+    """Build an audit log entry from a row selected with AUDIT_COLUMNS."""
+    # Positional access skips sqlite3.Row's per-field name lookup
+    return dict(zip(AUDIT_COLUMNS, (*row[:4], load_value(row[4]), load_value(row[5]), row[6])))
 
 
 def log_action(
@@ -14,6 +55,7 @@ def log_action(
     action: str,
     old_value: dict[str, Any] | None = None,
     new_value: dict[str, Any] | None = None,
+    conn: sqlite3.Connection | None = None,
 ) -> int:
     """Log an action to the audit log.
 
@@ -23,34 +65,79 @@ def log_action(
         action: Action performed (create, update, delete, move)
         old_value: Previous state of the entity (for updates/deletes)
         new_value: New state of the entity (for creates/updates)
+        conn: Open connection to log within; the caller owns the commit
 
     Returns:
         ID of the created audit log entry
     """
+    params = (
+        entity_type,
+        entity_id,
+        action,
+        dump_value(old_value),
+        dump_value(new_value),
+        datetime.now().isoformat(),
+    )
+    if conn is not None:
+        return conn.execute(INSERT_AUDIT_SQL, params).lastrowid
+
     with get_db() as conn:
-        cursor = conn.execute(
-            """
-            INSERT INTO audit_log (entity_type, entity_id, action, old_value, new_value, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (
-                entity_type,
-                entity_id,
-                action,
-                json.dumps(old_value) if old_value else None,
-                json.dumps(new_value) if new_value else None,
-                datetime.now().isoformat(),
-            ),
-        )
+        cursor = conn.execute(INSERT_AUDIT_SQL, params)
         conn.commit()
         return cursor.lastrowid
 
 
+def log_actions_bulk(entries: list[dict[str, Any]]) -> int:
+    """Log many actions to the audit log in a single statement.
+
+    Args:
+        entries: Dicts with the same keys as log_action's arguments
+            (entity_type, entity_id, action, optional old_value/new_value)
+
+    Returns:
+        Number of audit log entries created
+    """
+    if not entries:
+        return 0
+
+    timestamp = datetime.now().isoformat()
+    batch = msgspec.json.encode([
+        {
+            "entity_type": entry["entity_type"],
+            "entity_id": entry["entity_id"],
+            "action": entry["action"],
+            "old_value": entry.get("old_value") or None,
+            "new_value": entry.get("new_value") or None,
+            "timestamp": timestamp,
+        }
+        for entry in entries
+    ]).decode()
+
+    with get_db() as conn:
+        cursor = conn.execute(INSERT_AUDIT_BULK_SQL, (batch,))
+        conn.commit()
+        return cursor.rowcount
+
+
+@lru_cache(maxsize=None)
+def audit_logs_sql(by_type: bool, by_id: bool, keyset: bool) -> str:
+    """get_audit_logs query for one filter shape, built once per shape."""
+    query = f"{SELECT_AUDIT_SQL} WHERE 1=1"
+    if by_type:
+        query += " AND entity_type = ?"
+    if by_id:
+        query += " AND entity_id = ?"
+    if keyset:
+        query += " AND (timestamp, id) < (?, ?)"
+    return query + " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+
+
 def get_audit_logs(
     entity_type: str | None = None,
     entity_id: int | None = None,
     limit: int = 100,
     offset: int = 0,
+    before: tuple[str, int] | None = None,
 ) -> list[dict[str, Any]]:
     """Get audit logs with optional filtering.
 
@@ -58,46 +145,31 @@ def get_audit_logs(
         entity_type: Filter by entity type
         entity_id: Filter by entity ID
         limit: Maximum number of records to return
-        offset: Number of records to skip
+        offset: Number of records to skip (prefer `before` for deep pages)
+        before: Keyset cursor - (timestamp, id) of the last entry of the
+            previous page; only older entries are returned
 
     Returns:
-        List of audit log entries
+        List of audit log entries, newest first
     """
-    with get_db() as conn:
-        query = "SELECT * FROM audit_log WHERE 1=1"
-        params: list[Any] = []
-
-        if entity_type:
-            query += " AND entity_type = ?"
-            params.append(entity_type)
-
-        if entity_id:
-            query += " AND entity_id = ?"
-            params.append(entity_id)
-
-        query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-
+    params: list[Any] = []
+    if entity_type:
+        params.append(entity_type)
+    if entity_id:
+        params.append(entity_id)
+    if before:
+        params.extend(before)
+    params.extend([limit, offset])
+    query = audit_logs_sql(bool(entity_type), bool(entity_id), bool(before))
+
+    with get_db_readonly() as conn:
         cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-
-        return [
-            {
-                "id": row["id"],
-                "entity_type": row["entity_type"],
-                "entity_id": row["entity_id"],
-                "action": row["action"],
-                "old_value": json.loads(row["old_value"]) if row["old_value"] else None,
-                "new_value": json.loads(row["new_value"]) if row["new_value"] else None,
-                "timestamp": row["timestamp"],
-            }
-            for row in rows
-        ]
+        return list(map(audit_entry, cursor.fetchall()))
 
 
 def get_audit_stats() -> dict[str, Any]:
     """Get audit log statistics."""
-    with get_db() as conn:
+    with get_db_readonly() as conn:
         # Total actions
         cursor = conn.execute("SELECT COUNT(*) as total FROM audit_log")
         total = cursor.fetchone()["total"]
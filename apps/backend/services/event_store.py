@@ -1,11 +1,79 @@
 """Event sourcing store for complete state reconstruction."""
 
-import json
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Any, Generator
 
-from database import get_db
+from database import get_db, get_db_readonly
+from services import audit_service
+from services.audit_service import load_value
+
+# Past-tense verbs used in activity feed summaries
+ACTION_VERBS = {
+    "create": "created",
+    "update": "updated",
+    "delete": "deleted",
+    "move": "moved",
+    "acknowledge": "acknowledged",
+    "resolve": "resolved",
+    "restore": "restored",
+    "ai_analyze": "analyzed by AI",
+    "ai_auto_triage": "auto-triaged by AI",
+}
+
+# Entity types that can be restored, and the table backing each
+RESTORE_TABLES = {
+    "task": "tasks",
+    "column": "columns",
+    "monitor": "monitors",
+    "incident": "incidents",
+}
+
+
+@lru_cache(maxsize=None)
+def table_columns(table: str) -> frozenset[str]:
+    """Column names of a restorable table, read once from the schema."""
+    with get_db_readonly() as conn:
+        return frozenset(row["name"] for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+@lru_cache(maxsize=128)
+def update_sql(table: str, fields: tuple[str, ...]) -> str:
+    """UPDATE statement restoring `fields` of one row, built once per shape."""
+    set_clause = ", ".join(f"{f} = ?" for f in fields)
+    return f"UPDATE {table} SET {set_clause} WHERE id = ?"
+
+
+@lru_cache(maxsize=128)
+def insert_sql(table: str, fields: tuple[str, ...]) -> str:
+    """INSERT statement re-creating a deleted row, built once per shape."""
+    placeholders = ", ".join("?" * len(fields))
+    return f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({placeholders})"
+
+
+@lru_cache(maxsize=32)
+def activity_feed_sql(type_count: int, keyset: bool) -> str:
+    """get_activity_feed query for one filter shape, built once per shape."""
+    # Entity name is read by SQLite's JSON1 so the payloads are never decoded here
+    query = """
+        SELECT id, entity_type, entity_id, action, timestamp,
+               COALESCE(
+                   json_extract(new_value, '$.title'),
+                   json_extract(new_value, '$.name'),
+                   json_extract(old_value, '$.title'),
+                   json_extract(old_value, '$.name')
+               ) AS display_name
+        FROM audit_log
+        WHERE 1=1
+    """
+    if type_count:
+        placeholders = ", ".join("?" * type_count)
+        query += f" AND entity_type IN ({placeholders})"
+    if keyset:
+        query += " AND (timestamp, id) < (?, ?)"
+    return query + " ORDER BY timestamp DESC, id DESC LIMIT ?"
 
 
 @dataclass
@@ -25,35 +93,34 @@ class EventStore:
     """Event sourcing store with time-travel capabilities."""
 
     def get_entity_history(
-        self, entity_type: str, entity_id: int
+        self, entity_type: str, entity_id: int, until: str | None = None
     ) -> list[dict[str, Any]]:
         """Get complete history of an entity.
 
         Returns all events for an entity in chronological order,
-        allowing full state reconstruction.
+        allowing full state reconstruction. With `until`, only events
+        up to that timestamp are returned.
         """
-        with get_db() as conn:
+        with get_db_readonly() as conn:
             cursor = conn.execute(
                 """
-                SELECT * FROM audit_log
+                SELECT id, action, old_value, new_value, timestamp FROM audit_log
                 WHERE entity_type = ? AND entity_id = ?
+                AND (? IS NULL OR timestamp <= ?)
                 ORDER BY timestamp ASC
                 """,
-                (entity_type, entity_id),
+                (entity_type, entity_id, until, until),
             )
+            # Positional access skips sqlite3.Row's per-field name lookup
             return [
                 {
-                    "id": row["id"],
-                    "action": row["action"],
-                    "old_value": json.loads(row["old_value"])
-                    if row["old_value"]
-                    else None,
-                    "new_value": json.loads(row["new_value"])
-                    if row["new_value"]
-                    else None,
-                    "timestamp": row["timestamp"],
+                    "id": event_id,
+                    "action": action,
+                    "old_value": load_value(old_value),
+                    "new_value": load_value(new_value),
+                    "timestamp": timestamp,
                 }
-                for row in cursor.fetchall()
+                for event_id, action, old_value, new_value, timestamp in cursor.fetchall()
             ]
 
     def get_state_at(
@@ -64,10 +131,12 @@ class EventStore:
         This is the "time travel" feature - see what an entity
         looked like at any point in history.
         """
-        with get_db() as conn:
+        # Every audit row carries the entity's full state, so no replay (or
+        # snapshot table) is needed: this is a single seek on idx_audit_entity_ts.
+        with get_db_readonly() as conn:
             cursor = conn.execute(
                 """
-                SELECT * FROM audit_log
+                SELECT action, old_value, new_value, timestamp FROM audit_log
                 WHERE entity_type = ? AND entity_id = ?
                 AND timestamp <= ?
                 ORDER BY timestamp DESC
@@ -77,36 +146,44 @@ class EventStore:
             )
             row = cursor.fetchone()
 
-            if not row:
-                return None
-
-            # For updates and creates, new_value is the state
-            # For deletes, old_value is the last known state
-            if row["action"] == "delete":
-                state = json.loads(row["old_value"]) if row["old_value"] else None
-                if state:
-                    state["_deleted"] = True
-                    state["_deleted_at"] = row["timestamp"]
-                return state
-            else:
-                return json.loads(row["new_value"]) if row["new_value"] else None
+        return self._row_to_state(row) if row else None
+
+    def _row_to_state(self, row) -> dict[str, Any] | None:
+        """Entity state as recorded by a single audit log row."""
+        # For updates and creates, new_value is the state
+        # For deletes, old_value is the last known state
+        if row["action"] == "delete":
+            state = load_value(row["old_value"])
+            if state:
+                state["_deleted"] = True
+                state["_deleted_at"] = row["timestamp"]
+            return state
+        return load_value(row["new_value"])
 
     def replay_events(
-        self, entity_type: str, entity_id: int, until: str | None = None
+        self,
+        entity_type: str,
+        entity_id: int,
+        until: str | None = None,
+        snapshots: bool = True,
     ) -> Generator[dict[str, Any], None, None]:
         """Replay events to rebuild state incrementally.
 
-        Useful for debugging or auditing how state evolved.
+        Useful for debugging or auditing how state evolved. With
+        snapshots=False every step yields a read-only view of the live
+        state instead of a copy, which avoids O(fields) work per event
+        when only the latest state matters. The view reflects later
+        events once iteration continues - use dict(view) to keep one.
         """
+        # The fold stays in Python: SQLite's json_patch (RFC 7396) drops keys
+        # whose new value is null, which would not match dict.update here.
+        # Callers that only need the final state should use get_state_at.
         state = {}
-        history = self.get_entity_history(entity_type, entity_id)
+        history = self.get_entity_history(entity_type, entity_id, until)
 
         for event in history:
-            if until and event["timestamp"] > until:
-                break
-
             if event["action"] == "create":
-                state = event["new_value"] or {}
+                state = dict(event["new_value"] or {})
             elif event["action"] == "update":
                 if event["new_value"]:
                     state.update(event["new_value"])
@@ -115,7 +192,7 @@ class EventStore:
 
             yield {
                 "event": event,
-                "state_after": state.copy(),
+                "state_after": state.copy() if snapshots else MappingProxyType(state),
             }
 
     def diff_states(
@@ -126,8 +203,30 @@ class EventStore:
         timestamp2: str,
     ) -> dict[str, Any]:
         """Compare entity state between two points in time."""
-        state1 = self.get_state_at(entity_type, entity_id, timestamp1)
-        state2 = self.get_state_at(entity_type, entity_id, timestamp2)
+        # Latest event at or before each timestamp, fetched in one round trip
+        with get_db_readonly() as conn:
+            cursor = conn.execute(
+                """
+                SELECT * FROM (
+                    SELECT 1 AS slot, * FROM audit_log
+                    WHERE entity_type = ? AND entity_id = ? AND timestamp <= ?
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 2 AS slot, * FROM audit_log
+                    WHERE entity_type = ? AND entity_id = ? AND timestamp <= ?
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                )
+                """,
+                (entity_type, entity_id, timestamp1, entity_type, entity_id, timestamp2),
+            )
+            states = {row["slot"]: self._row_to_state(row) for row in cursor.fetchall()}
+
+        state1 = states.get(1)
+        state2 = states.get(2)
 
         if not state1 and not state2:
             return {"error": "Entity not found at either timestamp"}
@@ -173,23 +272,15 @@ class EventStore:
                 "last_known_state": target_state,
             }
 
-        # Remove internal fields
-        restore_data = {
-            k: v for k, v in target_state.items() if not k.startswith("_")
-        }
-
-        # Perform restoration based on entity type
-        table_map = {
-            "task": "tasks",
-            "column": "columns",
-            "monitor": "monitors",
-            "incident": "incidents",
-        }
-
-        table = table_map.get(entity_type)
+        table = RESTORE_TABLES.get(entity_type)
         if not table:
             return {"success": False, "error": f"Unknown entity type: {entity_type}"}
 
+        # Only real columns are written back - this drops internal "_" fields
+        # and keeps snapshot keys out of the generated SQL
+        columns = table_columns(table)
+        restore_data = {k: v for k, v in target_state.items() if k in columns}
+
         with get_db() as conn:
             # Check if entity exists
             cursor = conn.execute(
@@ -199,38 +290,26 @@ class EventStore:
 
             if exists:
                 # Update existing
-                fields = [k for k in restore_data.keys() if k != "id"]
-                set_clause = ", ".join(f"{f} = ?" for f in fields)
+                fields = tuple(k for k in restore_data if k != "id")
                 values = [restore_data[f] for f in fields] + [entity_id]
-
-                conn.execute(
-                    f"UPDATE {table} SET {set_clause} WHERE id = ?", values
-                )
+                conn.execute(update_sql(table, fields), values)
             else:
                 # Re-insert deleted entity
-                fields = list(restore_data.keys())
-                placeholders = ", ".join("?" * len(fields))
-                field_names = ", ".join(fields)
+                fields = tuple(restore_data)
                 values = [restore_data[f] for f in fields]
-
-                conn.execute(
-                    f"INSERT INTO {table} ({field_names}) VALUES ({placeholders})",
-                    values,
-                )
-
+                conn.execute(insert_sql(table, fields), values)
+
+            # Logged in the same transaction so the restore commits once
+            audit_service.log_action(
+                entity_type,
+                entity_id,
+                "restore",
+                old_value=dict(exists) if exists else None,
+                new_value=restore_data,
+                conn=conn,
+            )
             conn.commit()
 
-        # Log restoration
-        from services import audit_service
-
-        audit_service.log_action(
-            entity_type,
-            entity_id,
-            "restore",
-            old_value=dict(exists) if exists else None,
-            new_value=restore_data,
-        )
-
         return {
             "success": True,
             "entity_type": entity_type,
@@ -240,27 +319,20 @@ class EventStore:
         }
 
     def get_activity_feed(
-        self, limit: int = 50, entity_types: list[str] | None = None
+        self,
+        limit: int = 50,
+        entity_types: list[str] | None = None,
+        before: tuple[str, int] | None = None,
     ) -> list[dict[str, Any]]:
         """Get activity feed across all entities.
 
-        Useful for dashboard and real-time updates.
+        Useful for dashboard and real-time updates. Pass the (timestamp, id)
+        of the last item as `before` to fetch the next (older) page.
         """
-        with get_db() as conn:
-            query = """
-                SELECT * FROM audit_log
-                WHERE 1=1
-            """
-            params: list[Any] = []
-
-            if entity_types:
-                placeholders = ", ".join("?" * len(entity_types))
-                query += f" AND entity_type IN ({placeholders})"
-                params.extend(entity_types)
-
-            query += " ORDER BY timestamp DESC LIMIT ?"
-            params.append(limit)
+        params: list[Any] = [*(entity_types or ()), *(before or ()), limit]
+        query = activity_feed_sql(len(entity_types or ()), bool(before))
 
+        with get_db_readonly() as conn:
             cursor = conn.execute(query, params)
             return [
                 {
@@ -277,31 +349,8 @@ class EventStore:
     def _generate_summary(self, row) -> str:
         """Generate human-readable summary of an event."""
         entity = row["entity_type"]
-        action = row["action"]
-        entity_id = row["entity_id"]
-
-        if row["new_value"]:
-            data = json.loads(row["new_value"])
-            name = data.get("title") or data.get("name") or f"#{entity_id}"
-        elif row["old_value"]:
-            data = json.loads(row["old_value"])
-            name = data.get("title") or data.get("name") or f"#{entity_id}"
-        else:
-            name = f"#{entity_id}"
-
-        action_verbs = {
-            "create": "created",
-            "update": "updated",
-            "delete": "deleted",
-            "move": "moved",
-            "acknowledge": "acknowledged",
-            "resolve": "resolved",
-            "restore": "restored",
-            "ai_analyze": "analyzed by AI",
-            "ai_auto_triage": "auto-triaged by AI",
-        }
-
-        verb = action_verbs.get(action, action)
+        name = row["display_name"] or f"#{row['entity_id']}"
+        verb = ACTION_VERBS.get(row["action"], row["action"])
         return f'{entity.capitalize()} "{name}" was {verb}'
 
 
@@ -1,10 +1,28 @@
 """Gamification service for ANT HILL - points calculation and leaderboard."""
 
 import math
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
-from database import get_db
+from database import get_db, get_db_readonly
+from services.notification_service import notification_queue
+
+ALL_TIME_START = date(2000, 1, 1)
+ALL_TIME_END = date(2099, 12, 31)
+
+
+@lru_cache(maxsize=64)
+def period_bounds(day: date) -> tuple[tuple[str, date, date], ...]:
+    """(period_type, start, end) of every leaderboard period containing `day`."""
+    week_start = day - timedelta(days=day.weekday())
+    month_start = day.replace(day=1)
+    return (
+        ("daily", day, day + timedelta(days=1)),
+        ("weekly", week_start, week_start + timedelta(days=7)),
+        ("monthly", month_start, (month_start + timedelta(days=32)).replace(day=1)),
+        ("all_time", ALL_TIME_START, ALL_TIME_END),
+    )
 
 
 def calculate_points(estimated_minutes: int) -> int:
@@ -22,20 +40,18 @@ def calculate_bonus_points(
 ) -> int:
     """Calculate bonus points based on efficiency and priority."""
     bonus = 0
+    base_points = calculate_points(estimated_minutes)
     estimated_seconds = estimated_minutes * 60
 
     # Bonus 1: Completed faster than estimate (+20%)
     if estimated_seconds > 0 and actual_seconds < estimated_seconds * 0.8:
-        base_points = calculate_points(estimated_minutes)
         bonus += int(base_points * 0.2)
 
     # Bonus 2: Completed before deadline (+10%)
+    # fromisoformat is implemented in C since Python 3.11 - no third-party parser needed
     if due_date and completed_at:
         try:
-            due_dt = datetime.fromisoformat(due_date)
-            completed_dt = datetime.fromisoformat(completed_at)
-            if completed_dt < due_dt:
-                base_points = calculate_points(estimated_minutes)
+            if datetime.fromisoformat(completed_at) < datetime.fromisoformat(due_date):
                 bonus += int(base_points * 0.1)
         except (ValueError, TypeError):
             pass
@@ -52,6 +68,9 @@ def calculate_bonus_points(
 def award_points_for_task(task_id: int, user_id: str) -> dict:
     """Award points to user when task is completed."""
     with get_db() as conn:
+        # Take the write lock up front so all upserts + notification commit together
+        conn.execute("BEGIN IMMEDIATE")
+
         # Get task details
         task = conn.execute(
             """SELECT estimated_minutes, time_spent_seconds, due_date,
@@ -84,50 +103,34 @@ def award_points_for_task(task_id: int, user_id: str) -> dict:
         user_name = user["name"] if user else "Unknown"
 
         # Update user_points for all periods
-        now = datetime.now()
-        periods = [
-            ("daily", now.date(), now.date() + timedelta(days=1)),
-            (
-                "weekly",
-                now.date() - timedelta(days=now.weekday()),
-                now.date() - timedelta(days=now.weekday()) + timedelta(days=7),
-            ),
-            (
-                "monthly",
-                now.date().replace(day=1),
-                (now.date().replace(day=1) + timedelta(days=32)).replace(day=1),
-            ),
-            ("all_time", datetime(2000, 1, 1).date(), datetime(2099, 12, 31).date()),
-        ]
-
-        for period_type, period_start, period_end in periods:
-            conn.execute(
-                """INSERT INTO user_points
-                   (user_id, period_type, period_start, period_end, points_earned, tasks_completed, bonus_points)
-                   VALUES (?, ?, ?, ?, ?, 1, ?)
-                   ON CONFLICT(user_id, period_type, period_start) DO UPDATE SET
-                       points_earned = points_earned + excluded.points_earned,
-                       tasks_completed = tasks_completed + 1,
-                       bonus_points = bonus_points + excluded.bonus_points,
-                       updated_at = CURRENT_TIMESTAMP
-                """,
-                (user_id, period_type, period_start, period_end, base_points, bonus),
-            )
-
-        # Create notification
-        conn.execute(
-            """INSERT INTO notifications
-               (user_id, notification_type, title, message, related_task_id)
-               VALUES (NULL, 'points_awarded', ?, ?, ?)""",
-            (
-                f"💎 {user_name} získal {total_points} bodů!",
-                f"Dokončil task: {title}",
-                task_id,
-            ),
+        periods = period_bounds(date.today())
+
+        conn.executemany(
+            """INSERT INTO user_points
+               (user_id, period_type, period_start, period_end, points_earned, tasks_completed, bonus_points)
+               VALUES (?, ?, ?, ?, ?, 1, ?)
+               ON CONFLICT(user_id, period_type, period_start) DO UPDATE SET
+                   points_earned = points_earned + excluded.points_earned,
+                   tasks_completed = tasks_completed + 1,
+                   bonus_points = bonus_points + excluded.bonus_points,
+                   updated_at = CURRENT_TIMESTAMP
+            """,
+            [
+                (user_id, period_type, period_start, period_end, base_points, bonus)
+                for period_type, period_start, period_end in periods
+            ],
         )
 
         conn.commit()
 
+        # Notification is written in the background, outside the completion transaction
+        notification_queue.put(
+            "points_awarded",
+            f"💎 {user_name} získal {total_points} bodů!",
+            f"Dokončil task: {title}",
+            task_id,
+        )
+
         return {
             "base_points": base_points,
             "bonus_points": bonus,
@@ -137,32 +140,17 @@ def award_points_for_task(task_id: int, user_id: str) -> dict:
 
 def get_leaderboard(period_type: str = "weekly", limit: int = 10) -> list[dict]:
     """Get leaderboard for specified period."""
-    with get_db() as conn:
+    with get_db_readonly() as conn:
         # Get current period bounds
-        now = datetime.now()
-        if period_type == "weekly":
-            period_start = now.date() - timedelta(days=now.weekday())
-        elif period_type == "monthly":
-            period_start = now.date().replace(day=1)
-        elif period_type == "all_time":
-            period_start = datetime(2000, 1, 1).date()
-        else:  # daily
-            period_start = now.date()
-
-        # Query leaderboard with user info
+        starts = {ptype: start for ptype, start, _ in period_bounds(date.today())}
+        period_start = starts.get(period_type, starts["daily"])
+
+        # Query leaderboard read model (maintained by triggers on user_points/users)
         rows = conn.execute(
-            """SELECT
-                   up.user_id,
-                   u.name as user_name,
-                   u.email as user_email,
-                   u.avatar_url,
-                   up.points_earned,
-                   up.tasks_completed,
-                   up.bonus_points,
-                   (up.points_earned + up.bonus_points) as total_points
-               FROM user_points up
-               JOIN users u ON up.user_id = u.id
-               WHERE up.period_type = ? AND up.period_start = ?
+            """SELECT user_id, user_name, user_email, avatar_url,
+                      points_earned, tasks_completed, bonus_points, total_points
+               FROM leaderboard_cache
+               WHERE period_type = ? AND period_start = ?
                ORDER BY total_points DESC
                LIMIT ?""",
             (period_type, period_start, limit),
@@ -186,10 +174,10 @@ def get_leaderboard(period_type: str = "weekly", limit: int = 10) -> list[dict]:
 
 def get_user_stats(user_id: str) -> dict:
     """Get statistics for a specific user."""
-    with get_db() as conn:
+    with get_db_readonly() as conn:
         # Get all-time stats
         all_time = conn.execute(
-            """SELECT points_earned, tasks_completed, bonus_points
+            """SELECT tasks_completed, total_points
                FROM user_points
                WHERE user_id = ? AND period_type = 'all_time'
                LIMIT 1""",
@@ -204,7 +192,7 @@ def get_user_stats(user_id: str) -> dict:
                 "efficiency_ratio": 0,
             }
 
-        total_points = all_time["points_earned"] + all_time["bonus_points"]
+        total_points = all_time["total_points"]
         tasks = all_time["tasks_completed"]
 
         # Calculate efficiency (sum of time_spent vs estimated)
@@ -1,122 +1,233 @@
 """Google Calendar integration service."""
 
+import asyncio
+import hashlib
 import logging
-import os
-from datetime import datetime, timedelta
-from typing import Optional
+from collections import Counter, defaultdict
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from typing import Awaitable, Iterable, Mapping, Optional
 import httpx
+import msgspec
 
 from database import get_db
-from auth.token_service import TokenService
+from .google_api import (
+    MAX_RETRIES,
+    ApiResult,
+    GoogleApiService,
+    api_result,
+    batch_request_body,
+    parse_batch_response,
+    retry_delay,
+)
 
 logger = logging.getLogger(__name__)
 
-CLERK_SECRET_KEY = os.getenv("CLERK_SECRET_KEY", "")
-
+# Concurrent Calendar API calls per sync run (stays well inside Google's rate limits)
+SYNC_CONCURRENCY = 10
+# Google Calendar accepts at most 50 requests per batch call
+BATCH_SIZE = 50
+# Largest page events.list returns
+MAX_PAGE_SIZE = 2500
+# Task fields the calendar sync reads (avoids loading whole rows)
+SYNC_TASK_COLUMNS = (
+    "id, project_id, title, description, due_date, completed, google_event_id, calendar_sync_hash"
+)
+# Timezone of task events pushed to Calendar
+EVENT_TIMEZONE = "Europe/Prague"
+# Summary prefix marking events created from tasks
+TASK_PREFIX = "[Task] "
+# Length of events created for tasks (and of events created without an end)
+EVENT_DURATION = timedelta(hours=1)
+
+
+# Statuses meaning the event no longer exists in Calendar
+GONE_STATUSES = (404, 410)
+
+
+def rfc3339_utc(value: datetime) -> str:
+    """UTC RFC 3339 timestamp for Calendar query bounds (naive values are local time)."""
+    return value.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def event_body(
+    summary: str,
+    description: Optional[str],
+    start_iso: str,
+    end_iso: str,
+    timezone: str = EVENT_TIMEZONE,
+) -> dict:
+    """Calendar event payload shared by create and update requests."""
+    return {
+        "summary": summary,
+        "description": description or "",
+        "start": {"dateTime": start_iso, "timeZone": timezone},
+        "end": {"dateTime": end_iso, "timeZone": timezone},
+    }
+
+
+def event_hash(body: dict) -> bytes:
+    """Digest of an event payload, stored per task to skip unchanged updates."""
+    return hashlib.blake2b(msgspec.json.encode(body), digest_size=16).digest()
+
+
+@lru_cache(maxsize=1024)
+def task_event_times(due_date: str | datetime) -> tuple[str, str]:
+    """(start, end) ISO strings of the 1h event for a task due date.
+
+    Cached because a sync run sees the same due dates over and over.
+    """
+    if isinstance(due_date, str):
+        # Python 3.11+ parses "Z" and offsets in C; keeping them means UTC due
+        # dates are no longer shifted into EVENT_TIMEZONE as if they were local
+        due_datetime = datetime.fromisoformat(due_date)
+    else:
+        due_datetime = due_date
+    return due_datetime.isoformat(), (due_datetime + EVENT_DURATION).isoformat()
+
+
+def write_event_ids(updates: list[tuple[Optional[str], Optional[bytes], int]]) -> None:
+    """Store (google_event_id, calendar_sync_hash, task_id) changes in one transaction.
+
+    Blocking; calendar sync calls it through asyncio.to_thread.
+    """
+    if not updates:
+        return
+    with get_db() as conn:
+        conn.executemany(
+            "UPDATE tasks SET google_event_id = ?, calendar_sync_hash = ? WHERE id = ?",
+            updates,
+        )
+        conn.commit()
 
-class CalendarService:
-    """Service for Google Calendar operations."""
 
-    CALENDAR_API_BASE = "https://www.googleapis.com/calendar/v3"
+class SyncTokenExpired(Exception):
+    """Google rejected a stored Calendar sync token (410 Gone)."""
 
-    def __init__(self, user_id: str):
-        self.user_id = user_id
-        self._access_token: Optional[str] = None
 
-    async def _get_access_token(self) -> Optional[str]:
-        """Get valid access token from Clerk or local storage."""
-        if self._access_token:
-            return self._access_token
+class CalendarService(GoogleApiService):
+    """Service for Google Calendar operations."""
 
-        clerk_token = await self._get_clerk_google_token()
-        if clerk_token:
-            self._access_token = clerk_token
-            return self._access_token
+    CALENDAR_API_BASE = "https://www.googleapis.com/calendar/v3"
+    CALENDAR_BATCH_URL = "https://www.googleapis.com/batch/calendar/v3"
 
-        token_data = TokenService.get_token(self.user_id, "google")
-        if not token_data:
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[dict] = None,
+        params: Optional[dict] = None,
+    ) -> Optional[httpx.Response]:
+        """Send an authenticated Calendar API request; None if it could not be sent."""
+        headers = await self._get_headers()
+        if headers is None:
             return None
 
-        if TokenService.is_token_expired(self.user_id, "google"):
-            refreshed = TokenService.refresh_google_token(self.user_id)
-            if not refreshed:
-                return None
-            token_data = TokenService.get_token(self.user_id, "google")
+        url = f"{self.CALENDAR_API_BASE}{endpoint}"
 
-        self._access_token = token_data.get("access_token")
-        return self._access_token
+        # Bodies are encoded with msgspec; httpx's json= would go through stdlib json
+        content = msgspec.json.encode(data) if data is not None else None
 
-    async def _get_clerk_google_token(self) -> Optional[str]:
-        """Get Google OAuth token from Clerk Backend API."""
-        if not CLERK_SECRET_KEY:
-            logger.warning("CLERK_SECRET_KEY not configured")
+        try:
+            response = await self._request(
+                method, url, headers=headers, content=content, params=params
+            )
+        except Exception as e:
+            logger.error("Calendar API request failed: %s", str(e))
             return None
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"https://api.clerk.com/v1/users/{self.user_id}/oauth_access_tokens/oauth_google",
-                    headers={
-                        "Authorization": f"Bearer {CLERK_SECRET_KEY}",
-                        "Content-Type": "application/json",
-                    }
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    if data and len(data) > 0:
-                        return data[0].get("token")
-                return None
-            except Exception as e:
-                logger.error("Failed to get Clerk token: %s", str(e))
-                return None
+        if response.status_code == 401:
+            # Token was revoked or rotated early - look it up again next time
+            self._invalidate_token()
+        return response
 
     async def _make_request(
         self,
         method: str,
         endpoint: str,
         data: Optional[dict] = None,
-    ) -> Optional[dict]:
+        params: Optional[dict] = None,
+    ) -> ApiResult:
         """Make authenticated request to Calendar API."""
-        access_token = await self._get_access_token()
-        if not access_token:
-            logger.warning("No access token available")
-            return None
-
-        url = f"{self.CALENDAR_API_BASE}{endpoint}"
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json",
-        }
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            return ApiResult(False, 0)
 
-        async with httpx.AsyncClient() as client:
-            try:
-                if method == "GET":
-                    response = await client.get(url, headers=headers)
-                elif method == "POST":
-                    response = await client.post(url, headers=headers, json=data)
-                elif method == "PUT":
-                    response = await client.put(url, headers=headers, json=data)
-                elif method == "DELETE":
-                    response = await client.delete(url, headers=headers)
-                else:
-                    return None
+        response = await self._send(method, endpoint, data, params)
+        if response is None:
+            return ApiResult(False, 0)
 
-                if response.status_code in [200, 201]:
-                    return response.json() if response.content else {}
+        result = api_result(
+            response.status_code, response.content, response.headers.get("Retry-After")
+        )
+        if not result.ok:
+            logger.warning("Calendar API error: %d", response.status_code)
+        return result
 
+    async def _list_event_changes(
+        self,
+        calendar_id: str,
+        sync_token: Optional[str],
+    ) -> tuple[Optional[dict[str, dict]], Optional[str]]:
+        """List events changed since `sync_token` (all events when None).
+
+        Follows Google's incremental sync: pages are read until a
+        nextSyncToken is returned. Deleted events are included with
+        status "cancelled". Returns ({event_id: event}, next_sync_token),
+        or (None, None) if the listing failed. Raises SyncTokenExpired
+        when Google rejects the token (410); run a full listing then.
+        """
+        events: dict[str, dict] = {}
+        params: dict = {"maxResults": MAX_PAGE_SIZE}
+        if sync_token:
+            params["syncToken"] = sync_token
+        else:
+            params["showDeleted"] = "true"
+
+        while True:
+            response = await self._send("GET", f"/calendars/{calendar_id}/events", params=params)
+            if response is None:
+                return None, None
+
+            if response.status_code == 410 and sync_token:
+                raise SyncTokenExpired(calendar_id)
+
+            if response.status_code != 200:
                 logger.warning("Calendar API error: %d", response.status_code)
-                return None
-            except Exception as e:
-                logger.error("Calendar API request failed: %s", str(e))
-                return None
+                return None, None
+
+            page = msgspec.json.decode(response.content)
+            for event in page.get("items", []):
+                events[event["id"]] = event
+
+            if "nextPageToken" not in page:
+                return events, page.get("nextSyncToken")
+            params["pageToken"] = page["nextPageToken"]
+
+    async def _get_all_pages(
+        self,
+        endpoint: str,
+        params: Optional[dict] = None,
+        limit: Optional[int] = None,
+    ) -> list:
+        """GET a list endpoint, following nextPageToken until done or `limit` items."""
+        params = dict(params or {})
+        items: list = []
+        while limit is None or len(items) < limit:
+            if limit is not None:
+                params["maxResults"] = min(limit - len(items), MAX_PAGE_SIZE)
+            result = await self._make_request("GET", endpoint, params=params)
+            if not result.ok:
+                break
+            items.extend(result.body.get("items", []))
+            page_token = result.body.get("nextPageToken")
+            if not page_token:
+                break
+            params["pageToken"] = page_token
+        return items
 
     async def list_calendars(self) -> list:
         """List user's calendars."""
-        result = await self._make_request("GET", "/users/me/calendarList")
-        if result:
-            return result.get("items", [])
-        return []
+        return await self._get_all_pages("/users/me/calendarList")
 
     async def get_events(
         self,
@@ -125,24 +236,23 @@ class CalendarService:
         time_max: Optional[datetime] = None,
         max_results: int = 100,
     ) -> list:
-        """Get calendar events."""
+        """Get calendar events (up to max_results, across as many pages as needed)."""
         if not time_min:
             time_min = datetime.now()
         if not time_max:
             time_max = time_min + timedelta(days=30)
 
-        params = (
-            f"?timeMin={time_min.isoformat()}Z"
-            f"&timeMax={time_max.isoformat()}Z"
-            f"&maxResults={max_results}"
-            f"&orderBy=startTime"
-            f"&singleEvents=true"
-        )
+        # Encoded by httpx (timeMin/timeMax contain ':' and '+')
+        params = {
+            "timeMin": rfc3339_utc(time_min),
+            "timeMax": rfc3339_utc(time_max),
+            "orderBy": "startTime",
+            "singleEvents": "true",
+        }
 
-        result = await self._make_request("GET", f"/calendars/{calendar_id}/events{params}")
-        if result:
-            return result.get("items", [])
-        return []
+        return await self._get_all_pages(
+            f"/calendars/{calendar_id}/events", params, limit=max_results
+        )
 
     async def create_event(
         self,
@@ -151,26 +261,16 @@ class CalendarService:
         end: Optional[datetime] = None,
         description: Optional[str] = None,
         calendar_id: str = "primary",
-        timezone: str = "Europe/Prague",
+        timezone: str = EVENT_TIMEZONE,
     ) -> Optional[dict]:
         """Create a calendar event."""
         if not end:
-            end = start + timedelta(hours=1)
-
-        event_data = {
-            "summary": summary,
-            "description": description or "",
-            "start": {
-                "dateTime": start.isoformat(),
-                "timeZone": timezone,
-            },
-            "end": {
-                "dateTime": end.isoformat(),
-                "timeZone": timezone,
-            },
-        }
+            end = start + EVENT_DURATION
 
-        return await self._make_request("POST", f"/calendars/{calendar_id}/events", event_data)
+        event_data = event_body(summary, description, start.isoformat(), end.isoformat(), timezone)
+
+        result = await self._make_request("POST", f"/calendars/{calendar_id}/events", event_data)
+        return result.body
 
     async def update_event(
         self,
@@ -179,7 +279,8 @@ class CalendarService:
         calendar_id: str = "primary",
     ) -> Optional[dict]:
         """Update a calendar event."""
-        return await self._make_request("PUT", f"/calendars/{calendar_id}/events/{event_id}", updates)
+        result = await self._make_request("PUT", f"/calendars/{calendar_id}/events/{event_id}", updates)
+        return result.body
 
     async def delete_event(
         self,
@@ -188,7 +289,7 @@ class CalendarService:
     ) -> bool:
         """Delete a calendar event."""
         result = await self._make_request("DELETE", f"/calendars/{calendar_id}/events/{event_id}")
-        return result is not None
+        return result.ok
 
     async def get_event(
         self,
@@ -196,24 +297,185 @@ class CalendarService:
         calendar_id: str = "primary",
     ) -> Optional[dict]:
         """Get a single calendar event by ID."""
-        return await self._make_request("GET", f"/calendars/{calendar_id}/events/{event_id}")
+        result = await self._make_request("GET", f"/calendars/{calendar_id}/events/{event_id}")
+        return result.body
 
     def _get_done_column_id(self, cursor, task_project_id: int) -> Optional[int]:
-        """Get the 'Done' column ID for a project."""
+        """Get the 'Done' column ID for a project (its last column if none is named Done)."""
         cursor.execute(
-            "SELECT id FROM columns WHERE project_id = ? AND name = 'Done' ORDER BY position DESC LIMIT 1",
+            """SELECT id FROM columns WHERE project_id = ?
+               ORDER BY name = 'Done' DESC, position DESC LIMIT 1""",
             (task_project_id,)
         )
         row = cursor.fetchone()
-        if row:
-            return row["id"]
+        return row["id"] if row else None
 
-        cursor.execute(
-            "SELECT id FROM columns WHERE project_id = ? ORDER BY position DESC LIMIT 1",
-            (task_project_id,)
+    async def _gather_bounded(self, coros: Iterable[Awaitable]) -> list:
+        """Run Calendar API calls concurrently, at most SYNC_CONCURRENCY at a time.
+
+        Results keep the input order; exceptions are returned, not raised.
+        """
+        semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+
+        async def run(coro: Awaitable):
+            async with semaphore:
+                return await coro
+
+        return await asyncio.gather(*(run(c) for c in coros), return_exceptions=True)
+
+    def _plan_task(
+        self,
+        task: Mapping,
+        calendar_id: str = "primary",
+        recreate: bool = False,
+        force: bool = False,
+    ) -> Optional[tuple[str, Optional[str], Optional[str], Optional[dict]]]:
+        """Calendar request a task needs, as (action, method, endpoint, body).
+
+        action is "delete" (task completed), "clear" (due date removed),
+        "update", "create" or "unchanged" (event already matches the task,
+        nothing to send unless `force`); None when the task has no event.
+        With `recreate`, the task's current event is ignored and a new one
+        created.
+        """
+        due_date = task["due_date"]
+        existing_event_id = None if recreate else task["google_event_id"]
+        event_path = f"/calendars/{calendar_id}/events"
+
+        if existing_event_id and task["completed"] == 1:
+            return "delete", "DELETE", f"{event_path}/{existing_event_id}", None
+
+        if not due_date:
+            if existing_event_id:
+                return "clear", "DELETE", f"{event_path}/{existing_event_id}", None
+            return None
+
+        start_iso, end_iso = task_event_times(due_date)
+        event_data = event_body(
+            TASK_PREFIX + (task["title"] or ""), task["description"], start_iso, end_iso
         )
-        row = cursor.fetchone()
-        return row["id"] if row else None
+
+        if existing_event_id:
+            if not force and task["calendar_sync_hash"] == event_hash(event_data):
+                return "unchanged", None, None, None
+            return "update", "PUT", f"{event_path}/{existing_event_id}", event_data
+        return "create", "POST", event_path, event_data
+
+    def _task_outcome(
+        self,
+        task: Mapping,
+        plan: tuple[str, Optional[str], Optional[str], Optional[dict]],
+        response: Optional[ApiResult],
+    ) -> Optional[tuple[Optional[dict], Optional[tuple[Optional[str], Optional[bytes], int]]]]:
+        """Interpret the response to a planned task request.
+
+        Returns the sync result (None if the request failed) and, when the
+        task's event columns must change, a (google_event_id,
+        calendar_sync_hash, task_id) row for the caller to write. None means
+        the event no longer exists in Calendar and must be re-created.
+        """
+        action, _, _, body = plan
+        task_id = task["id"]
+        existing_event_id = task["google_event_id"]
+
+        if action == "unchanged":
+            return {"id": existing_event_id, "status": "unchanged"}, None
+
+        gone = response.status in GONE_STATUSES
+        if action in ("delete", "clear"):
+            if not (response.ok or gone):
+                return None, None
+            result = {"id": existing_event_id, "status": "deleted"} if action == "delete" else None
+            return result, (None, None, task_id)
+        if action == "update":
+            if gone:
+                return None
+            if not response.ok:
+                return None, None
+            return (
+                {"id": existing_event_id, "status": "updated"},
+                (existing_event_id, event_hash(body), task_id),
+            )
+
+        if response.ok and "id" in response.body:
+            return response.body, (response.body["id"], event_hash(body), task_id)
+        return None, None
+
+    async def _push_task(
+        self,
+        task: Mapping,
+        calendar_id: str = "primary",
+        force: bool = False,
+    ) -> tuple[Optional[dict], Optional[tuple[Optional[str], Optional[bytes], int]]]:
+        """Push one task's due date to Google Calendar without touching the database."""
+        plan = self._plan_task(task, calendar_id, force=force)
+        if plan is None:
+            return None, None
+        if plan[0] == "unchanged":
+            return self._task_outcome(task, plan, None)
+
+        outcome = self._task_outcome(task, plan, await self._make_request(*plan[1:]))
+        if outcome is None:
+            plan = self._plan_task(task, calendar_id, recreate=True)
+            outcome = self._task_outcome(task, plan, await self._make_request(*plan[1:]))
+        return outcome
+
+    async def _send_batch(
+        self,
+        requests: list[tuple[str, str, Optional[dict]]],
+    ) -> list[ApiResult]:
+        """Send up to BATCH_SIZE Calendar requests as one multipart/mixed call.
+
+        Returns one ApiResult per request, as _make_request would. If the batch
+        call itself fails, every request gets the batch's status. Transient
+        errors are not retried here; sync_all_tasks re-sends retryable parts.
+        """
+        headers = await self._get_headers()
+        if headers is None:
+            return [ApiResult(False, 0) for _ in requests]
+
+        content_type, content = batch_request_body(
+            httpx.URL(self.CALENDAR_API_BASE).path, requests
+        )
+
+        try:
+            response = await self._request(
+                "POST",
+                self.CALENDAR_BATCH_URL,
+                attempts=1,
+                content=content,
+                headers={"Authorization": headers["Authorization"], "Content-Type": content_type},
+            )
+        except Exception as e:
+            logger.error("Calendar batch request failed: %s", str(e))
+            return [ApiResult(False, 0) for _ in requests]
+
+        if response.status_code != 200:
+            if response.status_code == 401:
+                self._invalidate_token()
+            logger.warning("Calendar batch API error: %d", response.status_code)
+            failed = api_result(response.status_code, b"", response.headers.get("Retry-After"))
+            return [failed] * len(requests)
+
+        return parse_batch_response(
+            response.headers.get("content-type", ""), response.text, len(requests)
+        )
+
+    async def _batch_requests(
+        self,
+        requests: list[tuple[str, str, Optional[dict]]],
+    ) -> list[ApiResult]:
+        """Send Calendar requests in BATCH_SIZE chunks; results keep request order."""
+        chunks = [requests[i:i + BATCH_SIZE] for i in range(0, len(requests), BATCH_SIZE)]
+        results: list[ApiResult] = []
+        for chunk, chunk_results in zip(chunks, await self._gather_bounded(
+            self._send_batch(chunk) for chunk in chunks
+        )):
+            if isinstance(chunk_results, Exception):
+                logger.error("Calendar batch failed: %s", chunk_results)
+                chunk_results = [ApiResult(False, 0)] * len(chunk)
+            results.extend(chunk_results)
+        return results
 
     async def sync_task_to_calendar(
         self,
@@ -223,79 +485,19 @@ class CalendarService:
     ) -> Optional[dict]:
         """Sync a task's due date to Google Calendar."""
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-            task = cursor.fetchone()
-
-            if not task:
-                return None
-
-            task_dict = dict(task)
-            due_date = task_dict.get("due_date")
-            title = task_dict.get("title", "")
-            description = task_dict.get("description", "") or ""
-            is_completed = task_dict.get("completed", 0) == 1
-            existing_event_id = task_dict.get("google_event_id")
-
-            if is_completed and existing_event_id:
-                await self.delete_event(existing_event_id, calendar_id)
-                cursor.execute(
-                    "UPDATE tasks SET google_event_id = NULL WHERE id = ?",
-                    (task_id,)
-                )
-                conn.commit()
-                return {"id": existing_event_id, "status": "deleted"}
-
-            if not due_date:
-                if existing_event_id:
-                    await self.delete_event(existing_event_id, calendar_id)
-                    cursor.execute(
-                        "UPDATE tasks SET google_event_id = NULL WHERE id = ?",
-                        (task_id,)
-                    )
-                    conn.commit()
-                return None
+            task = conn.execute(
+                f"SELECT {SYNC_TASK_COLUMNS} FROM tasks WHERE id = ?", (task_id,)
+            ).fetchone()
 
-            if isinstance(due_date, str):
-                due_datetime = datetime.fromisoformat(due_date.replace("Z", ""))
-            else:
-                due_datetime = due_date
+        if not task:
+            return None
 
-            end_datetime = due_datetime + timedelta(hours=1)
+        result, event_id_update = await self._push_task(task, calendar_id, force=force_update)
 
-            if existing_event_id:
-                updates = {
-                    "summary": f"[Task] {title}",
-                    "description": description,
-                    "start": {
-                        "dateTime": due_datetime.isoformat(),
-                        "timeZone": "Europe/Prague",
-                    },
-                    "end": {
-                        "dateTime": end_datetime.isoformat(),
-                        "timeZone": "Europe/Prague",
-                    },
-                }
-                result = await self.update_event(existing_event_id, updates, calendar_id)
-                if result:
-                    return {"id": existing_event_id, "status": "updated"}
-                existing_event_id = None
-
-            result = await self.create_event(
-                summary=f"[Task] {title}",
-                start=due_datetime,
-                description=description,
-                calendar_id=calendar_id,
-            )
+        if event_id_update:
+            await asyncio.to_thread(write_event_ids, [event_id_update])
 
-            if result and "id" in result:
-                cursor.execute(
-                    "UPDATE tasks SET google_event_id = ? WHERE id = ?",
-                    (result["id"], task_id)
-                )
-                conn.commit()
-
-            return result
+        return result
 
     async def sync_all_tasks(
         self,
@@ -306,43 +508,111 @@ class CalendarService:
         with get_db() as conn:
             cursor = conn.cursor()
 
+            # Only tasks with a due date or an event can need a Calendar request
             if project_id:
                 cursor.execute(
-                    "SELECT * FROM tasks WHERE project_id = ?",
+                    f"""SELECT {SYNC_TASK_COLUMNS} FROM tasks
+                        WHERE project_id = ?
+                        AND (due_date IS NOT NULL OR google_event_id IS NOT NULL)""",
                     (project_id,)
                 )
             else:
-                cursor.execute("SELECT * FROM tasks")
+                cursor.execute(
+                    f"""SELECT {SYNC_TASK_COLUMNS} FROM tasks
+                        WHERE due_date IS NOT NULL OR google_event_id IS NOT NULL"""
+                )
 
             tasks = cursor.fetchall()
 
-            created = 0
-            updated = 0
-            deleted = 0
-            failed = 0
-
-            for task in tasks:
-                result = await self.sync_task_to_calendar(task["id"], calendar_id)
-                if result:
-                    status = result.get("status", "created")
-                    if status == "updated":
-                        updated += 1
-                    elif status == "deleted":
-                        deleted += 1
-                    else:
-                        created += 1
-                else:
-                    if task["due_date"]:
-                        failed += 1
+        created = 0
+        updated = 0
+        deleted = 0
+        unchanged = 0
+        failed = 0
 
+        if not tasks:
             return {
-                "synced": created,
-                "updated": updated,
-                "deleted": deleted,
-                "failed": failed,
-                "total": len(tasks),
+                "synced": 0, "updated": 0, "deleted": 0, "unchanged": 0, "failed": 0, "total": 0,
             }
 
+        # Resolve the token once instead of racing N lookups in the batches below
+        await self._get_access_token()
+        # API calls go out as multipart batches; database writes are applied afterwards
+        outcomes: list = [(None, None)] * len(tasks)
+        planned = []
+        for index, task in enumerate(tasks):
+            plan = self._plan_task(task, calendar_id)
+            if plan is None:
+                continue
+            if plan[0] == "unchanged":
+                # Event already matches the task - no request needed
+                outcomes[index] = self._task_outcome(task, plan, None)
+            else:
+                planned.append((index, plan))
+
+        # Later rounds re-send parts Google rate-limited or failed transiently,
+        # up to MAX_RETRIES rounds, and re-create events deleted in Calendar
+        # (a re-create gets its round even after the last retry round)
+        failures: Counter[int] = Counter()
+        attempt = 0
+        while planned:
+            responses = await self._batch_requests([plan[1:] for _, plan in planned])
+            retry = []
+            delay = 0.0
+            for (index, plan), response in zip(planned, responses):
+                task = tasks[index]
+                if response.retryable and attempt < MAX_RETRIES - 1:
+                    retry.append((index, plan))
+                    delay = max(delay, retry_delay(attempt, response.retry_after))
+                    continue
+                outcome = self._task_outcome(task, plan, response)
+                if outcome is None:
+                    retry.append((index, self._plan_task(task, calendar_id, recreate=True)))
+                    continue
+                if outcome[0] is None and not response.ok:
+                    failures[response.status] += 1
+                outcomes[index] = outcome
+            planned = retry
+            attempt += 1
+            if delay:
+                await asyncio.sleep(delay)
+
+        if failures:
+            # Keyed by HTTP status (0 = no response) to tell quota trouble from real errors
+            logger.warning("Calendar sync requests failed by status: %s", dict(failures))
+
+        pending_event_updates = []
+        for task, (result, event_id_update) in zip(tasks, outcomes):
+
+            if event_id_update:
+                pending_event_updates.append(event_id_update)
+
+            if result:
+                status = result.get("status", "created")
+                if status == "updated":
+                    updated += 1
+                elif status == "unchanged":
+                    unchanged += 1
+                elif status == "deleted":
+                    deleted += 1
+                else:
+                    created += 1
+            else:
+                if task["due_date"]:
+                    failed += 1
+
+        # One transaction for the whole run, committed off the event loop
+        await asyncio.to_thread(write_event_ids, pending_event_updates)
+
+        return {
+            "synced": created,
+            "updated": updated,
+            "deleted": deleted,
+            "unchanged": unchanged,
+            "failed": failed,
+            "total": len(tasks),
+        }
+
     async def sync_from_calendar(
         self,
         project_id: Optional[int] = None,
@@ -354,28 +624,91 @@ class CalendarService:
 
             if project_id:
                 cursor.execute(
-                    "SELECT * FROM tasks WHERE google_event_id IS NOT NULL AND project_id = ?",
+                    f"SELECT {SYNC_TASK_COLUMNS} FROM tasks WHERE google_event_id IS NOT NULL AND project_id = ?",
                     (project_id,)
                 )
             else:
                 cursor.execute(
-                    "SELECT * FROM tasks WHERE google_event_id IS NOT NULL"
+                    f"SELECT {SYNC_TASK_COLUMNS} FROM tasks WHERE google_event_id IS NOT NULL"
                 )
 
             tasks = cursor.fetchall()
 
-            completed_count = 0
-            updated_count = 0
-            checked_count = 0
+            cursor.execute(
+                "SELECT sync_token FROM calendar_sync_tokens WHERE user_id = ? AND calendar_id = ?",
+                (self.user_id, calendar_id)
+            )
+            row = cursor.fetchone()
+            sync_token = row["sync_token"] if row else None
+
+        # One paginated listing of changed events instead of a GET per task
+        try:
+            changes, next_sync_token = await self._list_event_changes(calendar_id, sync_token)
+        except SyncTokenExpired:
+            logger.info("Calendar sync token expired, running full sync")
+            # Forgotten even if the full listing fails, so it isn't tried again
+            with get_db() as conn:
+                conn.execute(
+                    "DELETE FROM calendar_sync_tokens WHERE user_id = ? AND calendar_id = ?",
+                    (self.user_id, calendar_id)
+                )
+                conn.commit()
+            sync_token = None
+            changes, next_sync_token = await self._list_event_changes(calendar_id, None)
+
+        if changes is None:
+            return {"completed": 0, "updated": 0, "checked": 0}
+
+        # A project-filtered run saw only part of the delta; don't advance past it
+        if project_id:
+            next_sync_token = None
+
+        # The writes and their commit run in a worker thread so the event loop
+        # keeps serving other requests while SQLite syncs to disk
+        return await asyncio.to_thread(
+            self._apply_calendar_changes,
+            tasks, changes, incremental=sync_token is not None,
+            calendar_id=calendar_id, next_sync_token=next_sync_token,
+        )
+
+    def _apply_calendar_changes(
+        self,
+        tasks: list,
+        changes: dict[str, dict],
+        incremental: bool,
+        calendar_id: str,
+        next_sync_token: Optional[str],
+    ) -> dict:
+        """Write Calendar changes back to tasks in one transaction.
+
+        Runs in a worker thread with its own connection. With `incremental`,
+        tasks whose event is not in `changes` are unchanged and skipped.
+        """
+        completed_count = 0
+        updated_count = 0
+        checked_count = 0
+
+        with get_db() as conn:
+            cursor = conn.cursor()
+
+            # Done column per project, looked up once per run
+            done_columns: dict[int, Optional[int]] = {}
+            # Field patches grouped by shape so each statement is prepared once
+            description_updates: list[tuple[str, int]] = []
+            title_updates: list[tuple[str, int]] = []
+            both_updates: list[tuple[str, str, int]] = []
+            # Tasks to complete, in order, per done column (None: no column to move to)
+            completions: defaultdict[Optional[int], list[int]] = defaultdict(list)
 
             for task in tasks:
-                task_dict = dict(task)
-                event_id = task_dict["google_event_id"]
-                task_project_id = task_dict.get("project_id", 1)
-                task_id = task_dict["id"]
-                is_already_completed = task_dict.get("completed", 0) == 1
+                task_project_id = task["project_id"]
+                task_id = task["id"]
+                is_already_completed = task["completed"] == 1
 
-                event = await self.get_event(event_id, calendar_id)
+                event = changes.get(task["google_event_id"])
+                if event is None and incremental:
+                    # Incremental sync: the event has not changed since last run
+                    continue
 
                 should_complete = False
                 if event is None:
@@ -388,56 +721,74 @@ class CalendarService:
                     event_description = event.get("description", "")
                     event_summary = event.get("summary", "")
 
-                    if event_summary.startswith("[Task] "):
-                        event_summary = event_summary[7:]
+                    event_summary = event_summary.removeprefix(TASK_PREFIX)
 
-                    current_description = task_dict.get("description") or ""
-                    current_title = task_dict.get("title") or ""
+                    current_description = task["description"] or ""
+                    current_title = task["title"] or ""
 
-                    updates = []
-                    params = []
+                    description_changed = event_description != current_description
+                    title_changed = bool(event_summary) and event_summary != current_title
 
-                    if event_description != current_description:
-                        updates.append("description = ?")
-                        params.append(event_description)
+                    if description_changed and title_changed:
+                        both_updates.append((event_description, event_summary, task_id))
+                    elif description_changed:
+                        description_updates.append((event_description, task_id))
+                    elif title_changed:
+                        title_updates.append((event_summary, task_id))
 
-                    if event_summary and event_summary != current_title:
-                        updates.append("title = ?")
-                        params.append(event_summary)
-
-                    if updates:
-                        params.append(task_id)
-                        cursor.execute(
-                            f"UPDATE tasks SET {', '.join(updates)} WHERE id = ?",
-                            params
-                        )
-                        conn.commit()
+                    if description_changed or title_changed:
                         updated_count += 1
 
                 if should_complete:
-                    done_column_id = self._get_done_column_id(cursor, task_project_id)
-
-                    if done_column_id:
-                        cursor.execute(
-                            "UPDATE tasks SET position = position + 1 WHERE column_id = ?",
-                            (done_column_id,)
-                        )
-
-                    if done_column_id:
-                        cursor.execute(
-                            "UPDATE tasks SET completed = 1, column_id = ?, position = 0 WHERE id = ?",
-                            (done_column_id, task_id)
-                        )
-                    else:
-                        cursor.execute(
-                            "UPDATE tasks SET completed = 1 WHERE id = ?",
-                            (task_id,)
-                        )
-                    conn.commit()
+                    if task_project_id not in done_columns:
+                        done_columns[task_project_id] = self._get_done_column_id(cursor, task_project_id)
+                    completions[done_columns[task_project_id] or None].append(task_id)
                     completed_count += 1
 
                 checked_count += 1
 
+            cursor.executemany(
+                "UPDATE tasks SET description = ? WHERE id = ?", description_updates
+            )
+            cursor.executemany("UPDATE tasks SET title = ? WHERE id = ?", title_updates)
+            cursor.executemany(
+                "UPDATE tasks SET description = ?, title = ? WHERE id = ?", both_updates
+            )
+
+            # Completed tasks go to the top of their done column, the last one
+            # completed first, as if each had been moved there in turn
+            for done_column_id, task_ids in completions.items():
+                if done_column_id is None:
+                    cursor.executemany(
+                        "UPDATE tasks SET completed = 1 WHERE id = ?",
+                        [(task_id,) for task_id in task_ids]
+                    )
+                    continue
+                cursor.execute(
+                    "UPDATE tasks SET position = position + ? WHERE column_id = ?",
+                    (len(task_ids), done_column_id)
+                )
+                cursor.executemany(
+                    "UPDATE tasks SET completed = 1, column_id = ?, position = ? WHERE id = ?",
+                    [
+                        (done_column_id, len(task_ids) - 1 - index, task_id)
+                        for index, task_id in enumerate(task_ids)
+                    ]
+                )
+
+            if next_sync_token:
+                cursor.execute(
+                    """INSERT INTO calendar_sync_tokens (user_id, calendar_id, sync_token)
+                       VALUES (?, ?, ?)
+                       ON CONFLICT(user_id, calendar_id) DO UPDATE SET
+                           sync_token = excluded.sync_token,
+                           updated_at = CURRENT_TIMESTAMP""",
+                    (self.user_id, calendar_id, next_sync_token)
+                )
+
+            # All title/description patches, completions and the token commit together
+            conn.commit()
+
             return {
                 "completed": completed_count,
                 "updated": updated_count,
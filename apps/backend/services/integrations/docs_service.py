@@ -1,40 +1,18 @@
 """Google Docs integration service."""
 
 from typing import Optional
-import httpx
+import msgspec
 
 from database import get_db
-from auth.token_service import TokenService
+from .google_api import GoogleApiService
 
 
-class DocsService:
+class DocsService(GoogleApiService):
     """Service for Google Docs operations."""
 
     DOCS_API_BASE = "https://docs.googleapis.com/v1"
     DRIVE_API_BASE = "https://www.googleapis.com/drive/v3"
 
-    def __init__(self, user_id: str):
-        self.user_id = user_id
-        self._access_token: Optional[str] = None
-
-    async def _get_access_token(self) -> Optional[str]:
-        """Get valid access token, refreshing if necessary."""
-        if self._access_token:
-            return self._access_token
-
-        token_data = TokenService.get_token(self.user_id, "google")
-        if not token_data:
-            return None
-
-        if TokenService.is_token_expired(self.user_id, "google"):
-            refreshed = TokenService.refresh_google_token(self.user_id)
-            if not refreshed:
-                return None
-            token_data = TokenService.get_token(self.user_id, "google")
-
-        self._access_token = token_data.get("access_token")
-        return self._access_token
-
     async def _make_request(
         self,
         method: str,
@@ -42,29 +20,26 @@ class DocsService:
         data: Optional[dict] = None,
     ) -> Optional[dict]:
         """Make authenticated request to Google API."""
-        access_token = await self._get_access_token()
-        if not access_token:
+        if method not in ("GET", "POST"):
             return None
 
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json",
-        }
-
-        async with httpx.AsyncClient() as client:
-            try:
-                if method == "GET":
-                    response = await client.get(url, headers=headers)
-                elif method == "POST":
-                    response = await client.post(url, headers=headers, json=data)
-                else:
-                    return None
-
-                if response.status_code in [200, 201]:
-                    return response.json() if response.content else {}
-                return None
-            except Exception:
-                return None
+        headers = await self._get_headers()
+        if headers is None:
+            return None
+
+        # Encoded with msgspec rather than httpx's stdlib json= path
+        content = msgspec.json.encode(data) if data is not None else None
+
+        try:
+            response = await self._request(method, url, headers=headers, content=content)
+
+            if response.status_code == 401:
+                self._invalidate_token()
+            if response.status_code in [200, 201]:
+                return msgspec.json.decode(response.content) if response.content else {}
+            return None
+        except Exception:
+            return None
 
     async def create_document(
         self,
@@ -1,18 +1,140 @@
 """Gmail integration service."""
 
 import base64
+import codecs
+import logging
 from email.mime.text import MIMEText
 from typing import Optional
 import httpx
 
-from database import get_db
+from database import get_db, get_db_readonly
 from auth.token_service import TokenService
+from .google_api import batch_request_body, parse_batch_response
+from .http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# Gmail allows 100 calls per batch but rate-limits batches above 50
+BATCH_SIZE = 50
+# Characters of the email body copied into tasks created from emails
+TASK_BODY_CHARS = 1000
+# UTF-8 takes at most 4 bytes per character: enough to fill TASK_BODY_CHARS
+# and tell whether the body was cut
+TASK_BODY_BYTES = 4 * (TASK_BODY_CHARS + 1)
+# Email tasks inserted per statement (4 bound parameters each)
+INSERT_CHUNK_SIZE = 500
+# Message headers surfaced by message_content
+CONTENT_HEADERS = frozenset({"subject", "from", "to", "date"})
+# Daily digest numbers; the scopes narrow both counts to one project
+DIGEST_STATS_SQL = """
+    SELECT
+        COUNT(*) AS total,
+        SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) AS completed,
+        SUM(CASE WHEN due_date < date('now') AND completed = 0 THEN 1 ELSE 0 END) AS overdue,
+        (SELECT COUNT(*) FROM incidents WHERE status = 'open'{incident_scope}) AS open_incidents
+    FROM tasks{task_scope}
+"""
+
+
+def decode_body(data: str, max_bytes: Optional[int] = None) -> str:
+    """Decode a base64url message body, or only its first max_bytes bytes.
+
+    Every 4 base64 characters hold 3 bytes, so a prefix is decoded without
+    touching the rest of the (possibly multi-MB) body.
+    """
+    if max_bytes is None or len(data) <= (max_bytes + 2) // 3 * 4:
+        return base64.urlsafe_b64decode(data).decode("utf-8")
+    prefix = base64.urlsafe_b64decode(data[:(max_bytes + 2) // 3 * 4])
+    # The cut may split a multi-byte character; a non-final incremental
+    # decode holds back its leading bytes instead of failing on them
+    return codecs.getincrementaldecoder("utf-8")().decode(prefix)
+
+
+def message_content(message: dict, max_body_bytes: Optional[int] = None) -> dict:
+    """Headers and plain-text body of a full Gmail message resource.
+
+    With max_body_bytes only that much of the body is decoded.
+    """
+    # Keep only the headers returned below (Gmail sends dozens per message)
+    headers = {}
+    for header in message.get("payload", {}).get("headers", ()):
+        name = header["name"].lower()
+        if name in CONTENT_HEADERS:
+            headers[name] = header["value"]
+
+    # Parse body
+    body = ""
+    payload = message.get("payload", {})
+
+    if "body" in payload and payload["body"].get("data"):
+        body = decode_body(payload["body"]["data"], max_body_bytes)
+    elif "parts" in payload:
+        for part in payload["parts"]:
+            if part.get("mimeType") == "text/plain" and part.get("body", {}).get("data"):
+                body = decode_body(part["body"]["data"], max_body_bytes)
+                break
+
+    return {
+        "id": message.get("id"),
+        "subject": headers.get("subject", ""),
+        "from": headers.get("from", ""),
+        "to": headers.get("to", ""),
+        "date": headers.get("date", ""),
+        "body": body,
+        "snippet": message.get("snippet", ""),
+    }
+
+
+def insert_email_tasks(messages: list[dict], project_id: int) -> list[dict]:
+    """Insert one task per parsed email in a single transaction; returns the rows."""
+    if not messages:
+        return []
+
+    rows = []
+    for message in messages:
+        title = f"[Email] {message['subject']}"
+        body = message["body"]
+        ellipsis = "..." if len(body) > TASK_BODY_CHARS else ""
+        description = f"""From: {message['from']}
+Date: {message['date']}
+
+{body[:TASK_BODY_CHARS]}{ellipsis}
+"""
+        rows.append((title, description))
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        # Get default column (To Do)
+        cursor.execute(
+            "SELECT id FROM columns WHERE name = 'To Do' AND project_id = ?",
+            (project_id,)
+        )
+        column = cursor.fetchone()
+        column_id = column["id"] if column else None
+
+        # Multi-row INSERT ... RETURNING hands back the stored rows without a
+        # read-back query; chunked to stay under SQLite's bound-parameter limit
+        tasks = []
+        for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+            chunk = rows[i:i + INSERT_CHUNK_SIZE]
+            cursor.execute(
+                "INSERT INTO tasks (title, description, column_id, project_id, priority) VALUES "
+                + ", ".join(["(?, ?, ?, ?, 'medium')"] * len(chunk))
+                + " RETURNING *",
+                [value for title, description in chunk for value in (title, description, column_id, project_id)],
+            )
+            tasks.extend(dict(task) for task in cursor.fetchall())
+        conn.commit()
+
+        return sorted(tasks, key=lambda task: task["id"])
 
 
 class GmailService:
     """Service for Gmail operations."""
 
     GMAIL_API_BASE = "https://gmail.googleapis.com/gmail/v1"
+    GMAIL_BATCH_URL = "https://gmail.googleapis.com/batch/gmail/v1"
 
     def __init__(self, user_id: str):
         self.user_id = user_id
@@ -23,19 +145,14 @@ class GmailService:
         if self._access_token:
             return self._access_token
 
-        token_data = TokenService.get_token(self.user_id, "google")
-        if not token_data:
-            return None
-
-        if TokenService.is_token_expired(self.user_id, "google"):
-            refreshed = TokenService.refresh_google_token(self.user_id)
-            if not refreshed:
-                return None
-            token_data = TokenService.get_token(self.user_id, "google")
-
-        self._access_token = token_data.get("access_token")
+        self._access_token = TokenService.get_access_token(self.user_id, "google")
         return self._access_token
 
+    def _invalidate_token(self) -> None:
+        """Forget the access token after a 401 so the next call looks it up again."""
+        TokenService.invalidate_access_token(self.user_id, "google")
+        self._access_token = None
+
     async def _make_request(
         self,
         method: str,
@@ -53,20 +170,18 @@ class GmailService:
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                if method == "GET":
-                    response = await client.get(url, headers=headers)
-                elif method == "POST":
-                    response = await client.post(url, headers=headers, json=data)
-                else:
-                    return None
-
-                if response.status_code in [200, 201]:
-                    return response.json() if response.content else {}
-                return None
-            except Exception:
-                return None
+        if method not in ("GET", "POST"):
+            return None
+
+        try:
+            response = await get_client().request(method, url, headers=headers, json=data)
+            if response.status_code in [200, 201]:
+                return response.json() if response.content else {}
+            if response.status_code == 401:
+                self._invalidate_token()
+            return None
+        except Exception:
+            return None
 
     async def list_messages(
         self,
@@ -87,38 +202,71 @@ class GmailService:
         """Get a specific message."""
         return await self._make_request("GET", f"/users/me/messages/{message_id}")
 
-    async def get_message_content(self, message_id: str) -> Optional[dict]:
+    async def get_message_content(
+        self,
+        message_id: str,
+        max_body_bytes: Optional[int] = None,
+    ) -> Optional[dict]:
         """Get message with full content parsed."""
         message = await self.get_message(message_id)
         if not message:
             return None
 
-        # Parse headers
-        headers = {}
-        for header in message.get("payload", {}).get("headers", []):
-            headers[header["name"].lower()] = header["value"]
-
-        # Parse body
-        body = ""
-        payload = message.get("payload", {})
-
-        if "body" in payload and payload["body"].get("data"):
-            body = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8")
-        elif "parts" in payload:
-            for part in payload["parts"]:
-                if part.get("mimeType") == "text/plain" and part.get("body", {}).get("data"):
-                    body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
-                    break
-
-        return {
-            "id": message_id,
-            "subject": headers.get("subject", ""),
-            "from": headers.get("from", ""),
-            "to": headers.get("to", ""),
-            "date": headers.get("date", ""),
-            "body": body,
-            "snippet": message.get("snippet", ""),
-        }
+        return message_content(message, max_body_bytes)
+
+    async def batch_get_messages(self, message_ids: list[str]) -> list[Optional[dict]]:
+        """Get several messages with one batch call per BATCH_SIZE ids.
+
+        Results keep the order of message_ids; None marks a message that
+        could not be fetched.
+        """
+        access_token = await self._get_access_token()
+        if not access_token:
+            return [None] * len(message_ids)
+
+        api_path = httpx.URL(self.GMAIL_API_BASE).path
+        messages: list[Optional[dict]] = []
+        # Batches go out one after another: each costs BATCH_SIZE messages.get
+        # quota units, and concurrent batches would trip the per-user rate limit
+        for i in range(0, len(message_ids), BATCH_SIZE):
+            chunk = message_ids[i:i + BATCH_SIZE]
+            content_type, content = batch_request_body(
+                api_path, [("GET", f"/users/me/messages/{message_id}", None) for message_id in chunk]
+            )
+            try:
+                response = await get_client().post(
+                    self.GMAIL_BATCH_URL,
+                    content=content,
+                    headers={"Authorization": f"Bearer {access_token}", "Content-Type": content_type},
+                )
+            except Exception as e:
+                logger.error("Gmail batch request failed: %s", str(e))
+                messages.extend([None] * len(chunk))
+                continue
+
+            if response.status_code != 200:
+                if response.status_code == 401:
+                    self._invalidate_token()
+                logger.warning("Gmail batch API error: %d", response.status_code)
+                messages.extend([None] * len(chunk))
+                continue
+
+            results = parse_batch_response(
+                response.headers.get("content-type", ""), response.text, len(chunk)
+            )
+            messages.extend(result.body if result.ok else None for result in results)
+        return messages
+
+    async def batch_get_message_contents(
+        self,
+        message_ids: list[str],
+        max_body_bytes: Optional[int] = None,
+    ) -> list[Optional[dict]]:
+        """get_message_content for several messages, fetched in batch calls."""
+        messages = await self.batch_get_messages(message_ids)
+        return [
+            message_content(message, max_body_bytes) if message else None for message in messages
+        ]
 
     async def send_email(
         self,
@@ -131,7 +279,8 @@ class GmailService:
         message["to"] = to
         message["subject"] = subject
 
-        raw = base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
+        # base64 output is ASCII: skip the UTF-8 decoder
+        raw = base64.urlsafe_b64encode(message.as_bytes()).decode("ascii")
 
         return await self._make_request(
             "POST",
@@ -141,41 +290,20 @@ class GmailService:
 
     async def create_task_from_email(self, message_id: str, project_id: int = 1) -> Optional[dict]:
         """Create a task from an email message."""
-        message = await self.get_message_content(message_id)
+        message = await self.get_message_content(message_id, max_body_bytes=TASK_BODY_BYTES)
         if not message:
             return None
 
-        with get_db() as conn:
-            cursor = conn.cursor()
-
-            # Get default column (To Do)
-            cursor.execute(
-                "SELECT id FROM columns WHERE name = 'To Do' AND project_id = ?",
-                (project_id,)
-            )
-            column = cursor.fetchone()
-            column_id = column["id"] if column else None
-
-            # Create task
-            title = f"[Email] {message['subject']}"
-            description = f"""From: {message['from']}
-Date: {message['date']}
-
-{message['body'][:1000]}{'...' if len(message['body']) > 1000 else ''}
-"""
+        tasks = insert_email_tasks([message], project_id)
+        return tasks[0] if tasks else None
 
-            cursor.execute("""
-                INSERT INTO tasks (title, description, column_id, project_id, priority)
-                VALUES (?, ?, ?, ?, ?)
-            """, (title, description, column_id, project_id, "medium"))
+    async def create_tasks_from_emails(self, message_ids: list[str], project_id: int = 1) -> list[dict]:
+        """Create one task per email, fetching the emails in batch calls.
 
-            task_id = cursor.lastrowid
-            conn.commit()
-
-            cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-            task = cursor.fetchone()
-
-            return dict(task) if task else None
+        Emails that cannot be fetched are skipped.
+        """
+        messages = await self.batch_get_message_contents(message_ids, max_body_bytes=TASK_BODY_BYTES)
+        return insert_email_tasks([message for message in messages if message], project_id)
 
     async def send_incident_notification(
         self,
@@ -228,37 +356,19 @@ This is an automated notification from Able2Flow.
         project_id: Optional[int] = None,
     ) -> Optional[dict]:
         """Send daily digest email with task and incident summary."""
-        with get_db() as conn:
-            cursor = conn.cursor()
-
-            # Get task stats
+        # Task and incident stats in one round trip
+        with get_db_readonly() as conn:
             if project_id:
-                cursor.execute("""
-                    SELECT
-                        COUNT(*) as total,
-                        SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) as completed,
-                        SUM(CASE WHEN due_date < date('now') AND completed = 0 THEN 1 ELSE 0 END) as overdue
-                    FROM tasks WHERE project_id = ?
-                """, (project_id,))
-            else:
-                cursor.execute("""
-                    SELECT
-                        COUNT(*) as total,
-                        SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) as completed,
-                        SUM(CASE WHEN due_date < date('now') AND completed = 0 THEN 1 ELSE 0 END) as overdue
-                    FROM tasks
-                """)
-            task_stats = dict(cursor.fetchone())
-
-            # Get open incidents
-            if project_id:
-                cursor.execute(
-                    "SELECT COUNT(*) as count FROM incidents WHERE status = 'open' AND project_id = ?",
-                    (project_id,)
-                )
+                stats = conn.execute(
+                    DIGEST_STATS_SQL.format(task_scope=" WHERE project_id = ?", incident_scope=" AND project_id = ?"),
+                    (project_id, project_id),
+                ).fetchone()
             else:
-                cursor.execute("SELECT COUNT(*) as count FROM incidents WHERE status = 'open'")
-            open_incidents = cursor.fetchone()["count"]
+                stats = conn.execute(
+                    DIGEST_STATS_SQL.format(task_scope="", incident_scope="")
+                ).fetchone()
+        task_stats = dict(stats)
+        open_incidents = stats["open_incidents"]
 
         subject = "[Able2Flow] Daily Digest"
 
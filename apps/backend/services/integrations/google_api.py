@@ -0,0 +1,264 @@
+"""Shared plumbing for the Google API integration services."""
+
+import asyncio
+import logging
+import os
+import re
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+import httpx
+import msgspec
+
+from auth.token_service import TokenService
+from .http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+CLERK_SECRET_KEY = os.getenv("CLERK_SECRET_KEY", "")
+CLERK_GOOGLE_TOKEN_URL = "https://api.clerk.com/v1/users/{}/oauth_access_tokens/oauth_google"
+# Built once: the Clerk secret does not change while the process runs
+CLERK_HEADERS = {
+    "Authorization": f"Bearer {CLERK_SECRET_KEY}",
+    "Content-Type": "application/json",
+}
+
+# Google access tokens live 1h; reuse Clerk's answer for 50 minutes across requests
+CLERK_TOKEN_TTL = 50 * 60
+CLERK_TOKEN_CACHE: dict[str, tuple[str, float]] = {}  # user_id -> (token, monotonic expiry)
+CLERK_TOKEN_LOCKS: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+# Users kept in the cache; the least recently used are evicted past this
+CLERK_TOKEN_CACHE_SIZE = 10_000
+
+# Attempts per Google API call when Google answers with a transient error
+MAX_RETRIES = 4
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Upper bound for a single backoff sleep, whatever Retry-After asks for
+MAX_RETRY_DELAY = 30.0
+
+
+def cached_clerk_token(user_id: str) -> Optional[str]:
+    """Unexpired cached Clerk token for a user, marking it recently used."""
+    cached = CLERK_TOKEN_CACHE.pop(user_id, None)
+    if cached is None or time.monotonic() >= cached[1]:
+        return None
+    CLERK_TOKEN_CACHE[user_id] = cached
+    return cached[0]
+
+
+def cache_clerk_token(user_id: str, token: str) -> None:
+    """Cache a Clerk token for CLERK_TOKEN_TTL, evicting least recently used users."""
+    CLERK_TOKEN_CACHE.pop(user_id, None)
+    CLERK_TOKEN_CACHE[user_id] = (token, time.monotonic() + CLERK_TOKEN_TTL)
+    while len(CLERK_TOKEN_CACHE) > CLERK_TOKEN_CACHE_SIZE:
+        evicted = next(iter(CLERK_TOKEN_CACHE))
+        del CLERK_TOKEN_CACHE[evicted]
+        lock = CLERK_TOKEN_LOCKS.get(evicted)
+        if lock is not None and not lock.locked():
+            del CLERK_TOKEN_LOCKS[evicted]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in seconds; None when absent or an HTTP date."""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def retry_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Seconds to wait before retrying: Retry-After if given, else 1, 2, 4, ..."""
+    delay = 2 ** attempt if retry_after is None else retry_after
+    return min(max(delay, 0.0), MAX_RETRY_DELAY)
+
+
+@dataclass(slots=True)
+class ApiResult:
+    """Outcome of one Google API call (or one part of a batch call)."""
+
+    ok: bool
+    status: int  # HTTP status; 0 when no response was received
+    body: Optional[dict] = None
+    retry_after: Optional[float] = None  # Retry-After seconds, if Google sent one
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRY_STATUSES
+
+
+def api_result(status: int, payload: bytes | str, retry_after: Optional[str] = None) -> ApiResult:
+    """ApiResult for a response status and raw body; 2xx bodies are decoded."""
+    if not 200 <= status < 300:
+        return ApiResult(False, status, retry_after=parse_retry_after(retry_after))
+    try:
+        return ApiResult(True, status, msgspec.json.decode(payload) if payload else {})
+    except msgspec.DecodeError as e:
+        logger.error("Unparseable Google API response: %s", str(e))
+        return ApiResult(False, status)
+
+
+def batch_request_body(
+    api_path: str,
+    requests: list[tuple[str, str, Optional[dict]]],
+) -> tuple[str, bytes]:
+    """(Content-Type, body) of a multipart/mixed batch call.
+
+    Each (method, endpoint, json body) request becomes one application/http
+    part with Content-ID <item-N>, which Google echoes as <response-item-N>.
+    """
+    boundary = f"batch_{uuid.uuid4().hex}"
+    parts: list[bytes] = []
+    for index, (method, endpoint, body) in enumerate(requests):
+        parts.append((
+            f"--{boundary}\r\n"
+            "Content-Type: application/http\r\n"
+            f"Content-ID: <item-{index}>\r\n\r\n"
+            f"{method} {api_path}{endpoint} HTTP/1.1\r\n"
+            "Content-Type: application/json\r\n\r\n"
+        ).encode())
+        if body is not None:
+            parts.append(msgspec.json.encode(body))
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return f"multipart/mixed; boundary={boundary}", b"".join(parts)
+
+
+def parse_batch_response(content_type: str, body: str, count: int) -> list[ApiResult]:
+    """Split a multipart/mixed batch response into per-request results.
+
+    Parts are matched to requests by their Content-ID (<response-item-N>);
+    requests without a matching part get ApiResult(ok=False, status=0).
+    """
+    results = [ApiResult(False, 0) for _ in range(count)]
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    if not match:
+        return results
+
+    for part in body.replace("\r\n", "\n").split(f"--{match.group(1)}"):
+        headers, _, http_message = part.partition("\n\n")
+        content_id = re.search(r"Content-ID:\s*<response-item-(\d+)>", headers, re.IGNORECASE)
+        if not content_id or int(content_id.group(1)) >= count:
+            continue
+
+        status_line, _, rest = http_message.strip("\n").partition("\n")
+        status_parts = status_line.split()
+        if len(status_parts) < 2 or not status_parts[1].isdigit():
+            continue
+
+        # The body follows the embedded response headers and a blank line
+        part_headers, _, payload = ("\n" + rest).partition("\n\n")
+        retry_after = re.search(r"^Retry-After:\s*(\S+)", part_headers, re.IGNORECASE | re.MULTILINE)
+        results[int(content_id.group(1))] = api_result(
+            int(status_parts[1]), payload.strip(), retry_after and retry_after.group(1)
+        )
+    return results
+
+
+
+class GoogleApiService:
+    """Base for per-user Google API services.
+
+    Resolves the user's Google access token (Clerk first, then the locally
+    stored OAuth token), caches request headers, and sends requests on the
+    shared HTTP client with retry/backoff for transient errors.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self._access_token: Optional[str] = None
+        self._headers: Optional[dict[str, str]] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Process-wide HTTP client; keep-alive connections outlive the request."""
+        return get_client()
+
+    async def _get_access_token(self) -> Optional[str]:
+        """Get valid access token from Clerk or local storage."""
+        if self._access_token:
+            return self._access_token
+
+        clerk_token = await self._get_clerk_google_token()
+        if clerk_token:
+            self._access_token = clerk_token
+            return self._access_token
+
+        self._access_token = TokenService.get_access_token(self.user_id, "google")
+        return self._access_token
+
+    async def _get_headers(self) -> Optional[dict[str, str]]:
+        """JSON request headers for the current access token, built once per token."""
+        if self._headers is None:
+            access_token = await self._get_access_token()
+            if not access_token:
+                logger.warning("No access token available")
+                return None
+            self._headers = {
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": "application/json",
+            }
+        return self._headers
+
+    def _invalidate_token(self) -> None:
+        """Forget the access token after a 401 so the next call looks it up again."""
+        CLERK_TOKEN_CACHE.pop(self.user_id, None)
+        TokenService.invalidate_access_token(self.user_id, "google")
+        self._access_token = None
+        self._headers = None
+
+    async def _get_clerk_google_token(self) -> Optional[str]:
+        """Get Google OAuth token from Clerk Backend API (cached per user)."""
+        if not CLERK_SECRET_KEY:
+            logger.warning("CLERK_SECRET_KEY not configured")
+            return None
+
+        token = cached_clerk_token(self.user_id)
+        if token:
+            return token
+
+        # One Clerk lookup per user at a time; waiters reuse its result
+        async with CLERK_TOKEN_LOCKS[self.user_id]:
+            token = cached_clerk_token(self.user_id)
+            if token:
+                return token
+
+            token = await self._fetch_clerk_google_token()
+            if token:
+                cache_clerk_token(self.user_id, token)
+            return token
+
+    async def _fetch_clerk_google_token(self) -> Optional[str]:
+        """Request the user's Google OAuth token from Clerk."""
+        try:
+            response = await self.client.get(
+                CLERK_GOOGLE_TOKEN_URL.format(self.user_id), headers=CLERK_HEADERS
+            )
+
+            if response.status_code == 200:
+                data = msgspec.json.decode(response.content)
+                if data and len(data) > 0:
+                    return data[0].get("token")
+            return None
+        except Exception as e:
+            logger.error("Failed to get Clerk token: %s", str(e))
+            return None
+
+    async def _request(
+        self, method: str, url: str, attempts: int = MAX_RETRIES, **kwargs
+    ) -> httpx.Response:
+        """Issue a request, retrying rate-limited and 5xx responses with backoff.
+
+        Pass attempts=1 when the caller retries on its own.
+        """
+        for attempt in range(attempts):
+            response = await self.client.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+                break
+            delay = retry_delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+            logger.info(
+                "Google API returned %d, retrying in %.1fs", response.status_code, delay
+            )
+            await asyncio.sleep(delay)
+        return response
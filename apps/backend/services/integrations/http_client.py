@@ -0,0 +1,36 @@
+"""Shared HTTP client for the integration services."""
+
+from typing import Optional
+
+import httpx
+
+# One keep-alive pool for every integration call, reused across requests.
+# HTTP/2 (httpx[http2]) multiplexes concurrent calls to a host over one
+# connection, so a handful per host is plenty; idle ones live for a minute.
+HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=8, max_connections=20, keepalive_expiry=60.0
+)
+HTTP_TIMEOUT = 10.0
+# Re-attempts of failed connection setups (never of sent requests)
+HTTP_CONNECT_RETRIES = 1
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Process-wide AsyncClient, created on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        transport = httpx.AsyncHTTPTransport(
+            http2=True, limits=HTTP_LIMITS, retries=HTTP_CONNECT_RETRIES
+        )
+        _client = httpx.AsyncClient(transport=transport, timeout=HTTP_TIMEOUT)
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client (application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
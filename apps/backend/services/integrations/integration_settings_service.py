@@ -1,14 +1,26 @@
 """Service for managing integration settings."""
 
-import json
+import time
 from typing import Optional
-from database import get_db
+import msgspec
+
+from database import get_db, get_db_readonly
+
+# Matches the settings row of (user_id, integration_type, project_id); a NULL
+# project_id is the user-wide row. Served by idx_integration_settings_scope.
+SCOPE_WHERE = "user_id = ? AND integration_type = ? AND COALESCE(project_id, -1) = COALESCE(?, -1)"
+
+# Per-user bitmaps of enabled user-wide integrations: user_id -> (bitmap, expiry)
+ENABLED_BITMAP_CACHE: dict[str, tuple[int, float]] = {}
+ENABLED_BITMAP_TTL = 60
 
 
 class IntegrationSettingsService:
     """Service for managing user integration settings."""
 
     INTEGRATION_TYPES = ["calendar", "docs", "gmail", "slack"]
+    # Bit of each integration type in get_enabled_bitmap results
+    INTEGRATION_BITS = {name: 1 << bit for bit, name in enumerate(INTEGRATION_TYPES)}
 
     @staticmethod
     def get_settings(
@@ -19,17 +31,10 @@ class IntegrationSettingsService:
         """Get integration settings for a user."""
         with get_db() as conn:
             cursor = conn.cursor()
-
-            if project_id:
-                cursor.execute("""
-                    SELECT * FROM integration_settings
-                    WHERE user_id = ? AND integration_type = ? AND project_id = ?
-                """, (user_id, integration_type, project_id))
-            else:
-                cursor.execute("""
-                    SELECT * FROM integration_settings
-                    WHERE user_id = ? AND integration_type = ? AND project_id IS NULL
-                """, (user_id, integration_type))
+            cursor.execute(
+                f"SELECT * FROM integration_settings WHERE {SCOPE_WHERE}",
+                (user_id, integration_type, project_id or None),
+            )
 
             row = cursor.fetchone()
             if not row:
@@ -37,7 +42,7 @@ class IntegrationSettingsService:
 
             settings = dict(row)
             if settings.get("settings"):
-                settings["settings"] = json.loads(settings["settings"])
+                settings["settings"] = msgspec.json.decode(settings["settings"])
             return settings
 
     @staticmethod
@@ -52,38 +57,18 @@ class IntegrationSettingsService:
         if integration_type not in IntegrationSettingsService.INTEGRATION_TYPES:
             raise ValueError(f"Invalid integration type: {integration_type}")
 
-        settings_json = json.dumps(settings)
+        settings_json = msgspec.json.encode(settings).decode()
 
         with get_db() as conn:
-            cursor = conn.cursor()
-
-            # Check if settings exist
-            if project_id:
-                cursor.execute("""
-                    SELECT id FROM integration_settings
-                    WHERE user_id = ? AND integration_type = ? AND project_id = ?
-                """, (user_id, integration_type, project_id))
-            else:
-                cursor.execute("""
-                    SELECT id FROM integration_settings
-                    WHERE user_id = ? AND integration_type = ? AND project_id IS NULL
-                """, (user_id, integration_type))
-
-            existing = cursor.fetchone()
-
-            if existing:
-                cursor.execute("""
-                    UPDATE integration_settings
-                    SET settings = ?, enabled = ?
-                    WHERE id = ?
-                """, (settings_json, enabled, existing["id"]))
-            else:
-                cursor.execute("""
-                    INSERT INTO integration_settings (user_id, project_id, integration_type, settings, enabled)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (user_id, project_id, integration_type, settings_json, enabled))
-
+            # Insert or update in one statement (unique idx_integration_settings_scope)
+            conn.execute("""
+                INSERT INTO integration_settings (user_id, project_id, integration_type, settings, enabled)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, integration_type, COALESCE(project_id, -1))
+                DO UPDATE SET settings = excluded.settings, enabled = excluded.enabled
+            """, (user_id, project_id or None, integration_type, settings_json, enabled))
             conn.commit()
+            ENABLED_BITMAP_CACHE.pop(user_id, None)
 
             return {
                 "user_id": user_id,
@@ -103,21 +88,12 @@ class IntegrationSettingsService:
         """Enable or disable an integration."""
         with get_db() as conn:
             cursor = conn.cursor()
-
-            if project_id:
-                cursor.execute("""
-                    UPDATE integration_settings
-                    SET enabled = ?
-                    WHERE user_id = ? AND integration_type = ? AND project_id = ?
-                """, (enabled, user_id, integration_type, project_id))
-            else:
-                cursor.execute("""
-                    UPDATE integration_settings
-                    SET enabled = ?
-                    WHERE user_id = ? AND integration_type = ? AND project_id IS NULL
-                """, (enabled, user_id, integration_type))
-
+            cursor.execute(
+                f"UPDATE integration_settings SET enabled = ? WHERE {SCOPE_WHERE}",
+                (enabled, user_id, integration_type, project_id or None),
+            )
             conn.commit()
+            ENABLED_BITMAP_CACHE.pop(user_id, None)
             return cursor.rowcount > 0
 
     @staticmethod
@@ -129,19 +105,12 @@ class IntegrationSettingsService:
         """Delete integration settings."""
         with get_db() as conn:
             cursor = conn.cursor()
-
-            if project_id:
-                cursor.execute("""
-                    DELETE FROM integration_settings
-                    WHERE user_id = ? AND integration_type = ? AND project_id = ?
-                """, (user_id, integration_type, project_id))
-            else:
-                cursor.execute("""
-                    DELETE FROM integration_settings
-                    WHERE user_id = ? AND integration_type = ? AND project_id IS NULL
-                """, (user_id, integration_type))
-
+            cursor.execute(
+                f"DELETE FROM integration_settings WHERE {SCOPE_WHERE}",
+                (user_id, integration_type, project_id or None),
+            )
             conn.commit()
+            ENABLED_BITMAP_CACHE.pop(user_id, None)
             return cursor.rowcount > 0
 
     @staticmethod
@@ -159,7 +128,7 @@ class IntegrationSettingsService:
             for row in cursor.fetchall():
                 item = dict(row)
                 if item.get("settings"):
-                    item["settings"] = json.loads(item["settings"])
+                    item["settings"] = msgspec.json.decode(item["settings"])
                 results.append(item)
             return results
 
@@ -170,5 +139,51 @@ class IntegrationSettingsService:
         project_id: Optional[int] = None,
     ) -> bool:
         """Check if an integration is enabled."""
-        settings = IntegrationSettingsService.get_settings(user_id, integration_type, project_id)
-        return settings.get("enabled", False) if settings else False
+        # Reads the flag alone: no full row, no settings JSON decode
+        with get_db() as conn:
+            row = conn.execute(
+                f"SELECT enabled FROM integration_settings WHERE {SCOPE_WHERE}",
+                (user_id, integration_type, project_id or None),
+            ).fetchone()
+        return bool(row["enabled"]) if row else False
+
+    @staticmethod
+    def get_enabled_bitmap(user_ids: list[str]) -> dict[str, int]:
+        """Enabled user-wide integrations of many users, as INTEGRATION_BITS bitmaps.
+
+        Test with bitmap & INTEGRATION_BITS[type]. Bitmaps are cached for
+        ENABLED_BITMAP_TTL seconds; users missing from the cache are read
+        in one query.
+        """
+        now = time.monotonic()
+        bitmaps: dict[str, int] = {}
+        missing: list[str] = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = ENABLED_BITMAP_CACHE.get(user_id)
+            if cached and now < cached[1]:
+                bitmaps[user_id] = cached[0]
+            else:
+                bitmaps[user_id] = 0
+                missing.append(user_id)
+
+        if missing:
+            bits = IntegrationSettingsService.INTEGRATION_BITS
+            with get_db_readonly() as conn:
+                # Chunked to stay under SQLite's bound-parameter limit
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i:i + 500]
+                    rows = conn.execute(
+                        f"""
+                        SELECT user_id, integration_type FROM integration_settings
+                        WHERE user_id IN ({", ".join("?" * len(chunk))})
+                        AND project_id IS NULL AND enabled
+                        """,
+                        chunk,
+                    )
+                    for user_id, integration_type in rows:
+                        bitmaps[user_id] |= bits.get(integration_type, 0)
+            expiry = now + ENABLED_BITMAP_TTL
+            for user_id in missing:
+                ENABLED_BITMAP_CACHE[user_id] = (bitmaps[user_id], expiry)
+
+        return bitmaps
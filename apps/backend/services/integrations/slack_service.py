@@ -1,13 +1,75 @@
 """Slack integration service."""
 
+import asyncio
 import os
-from typing import Optional
-import httpx
+import re
+from collections import defaultdict
+from typing import AsyncIterator, Optional
 
-from database import get_db
+from database import get_db, get_db_readonly
 from auth.token_service import TokenService
+from .http_client import get_client
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
+SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN", "")
+# conversations.list page size (Slack recommends no more than 200)
+CHANNELS_PAGE_SIZE = 200
+# Concurrent chat.postMessage calls in send_messages
+SEND_CONCURRENCY = 20
+# Seconds between messages to one channel (Slack allows about one per second)
+CHANNEL_MESSAGE_INTERVAL = 1.0
+# Slack errors meaning the token itself was rejected
+AUTH_ERRORS = frozenset({"invalid_auth", "not_authed", "token_revoked", "token_expired", "account_inactive"})
+
+# Record ids in Able2Flow links (a whole path segment of digits)
+TASK_URL_RE = re.compile(r"/tasks/(\d+)(?:[/?#]|$)")
+INCIDENT_URL_RE = re.compile(r"/incidents/(\d+)(?:[/?#]|$)")
+
+# Notification and unfurl styling
+SEVERITY_EMOJI = {
+    "critical": ":rotating_light:",
+    "warning": ":warning:",
+    "info": ":information_source:",
+}
+SEVERITY_COLOR = {
+    "critical": "#dc2626",
+    "warning": "#f59e0b",
+    "info": "#3b82f6",
+}
+STATUS_COLOR = {
+    "open": "#dc2626",
+    "acknowledged": "#f59e0b",
+    "resolved": "#10b981",
+}
+PRIORITY_EMOJI = {
+    "high": ":red_circle:",
+    "medium": ":yellow_circle:",
+    "low": ":white_circle:",
+}
+VIEW_INCIDENT_URL = f"{FRONTEND_URL}/incidents"
+HELP_TEXT = """*Able2Flow Slack Commands:*
+
+• `/able2flow create [task title]` - Create a new task
+• `/able2flow list` - List recent tasks
+• `/able2flow incidents` - List open incidents
+• `/able2flow help` - Show this help message"""
+
+
+def view_incident_button() -> dict:
+    """Static "View in Able2Flow" button of incident notifications.
+
+    Built per message so no payload shares (and can mutate) another's dicts.
+    """
+    return {
+        "type": "button",
+        "text": {
+            "type": "plain_text",
+            "text": "View in Able2Flow",
+            "emoji": True,
+        },
+        "url": VIEW_INCIDENT_URL,
+        "action_id": "view_incident",
+    }
 
 
 class SlackService:
@@ -17,16 +79,16 @@ class SlackService:
 
     def __init__(self, user_id: Optional[str] = None):
         self.user_id = user_id
-        self._bot_token = os.getenv("SLACK_BOT_TOKEN", "")
+        self._bot_token = SLACK_BOT_TOKEN
         self._access_token: Optional[str] = None
 
     async def _get_access_token(self) -> Optional[str]:
         """Get access token - either user token or bot token."""
         # Prefer user token if user_id is set
         if self.user_id:
-            token_data = TokenService.get_token(self.user_id, "slack")
-            if token_data:
-                return token_data.get("access_token")
+            access_token = TokenService.get_access_token(self.user_id, "slack")
+            if access_token:
+                return access_token
 
         # Fallback to bot token
         return self._bot_token if self._bot_token else None
@@ -48,34 +110,52 @@ class SlackService:
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                if method == "GET":
-                    response = await client.get(url, headers=headers, params=data)
-                elif method == "POST":
-                    response = await client.post(url, headers=headers, json=data)
-                else:
-                    return None
-
-                result = response.json()
-                if result.get("ok"):
-                    return result
-                return None
-            except Exception:
-                return None
+        if method not in ("GET", "POST"):
+            return None
+
+        try:
+            # Slack reads GET arguments from the query string
+            if method == "GET":
+                response = await get_client().get(url, headers=headers, params=data)
+            else:
+                response = await get_client().post(url, headers=headers, json=data)
+
+            result = response.json()
+            if result.get("ok"):
+                return result
+            if self.user_id and result.get("error") in AUTH_ERRORS:
+                TokenService.invalidate_access_token(self.user_id, "slack")
+            return None
+        except Exception:
+            return None
+
+    async def iter_channels(self) -> AsyncIterator[list]:
+        """Yield pages of Slack channels, following conversations.list cursors."""
+        params = {"types": "public_channel,private_channel", "limit": CHANNELS_PAGE_SIZE}
+        while True:
+            result = await self._make_request("GET", "conversations.list", params)
+            if not result:
+                return
+            yield result.get("channels", [])
+
+            cursor = result.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return
+            params["cursor"] = cursor
 
     async def list_channels(self) -> list:
-        """List available Slack channels."""
-        result = await self._make_request("GET", "conversations.list", {"types": "public_channel,private_channel"})
-        if result:
-            return result.get("channels", [])
-        return []
+        """List available Slack channels (all pages)."""
+        channels = []
+        async for page in self.iter_channels():
+            channels.extend(page)
+        return channels
 
     async def send_message(
         self,
         channel: str,
         text: str,
         blocks: Optional[list] = None,
+        attachments: Optional[list] = None,
     ) -> Optional[dict]:
         """Send a message to a Slack channel."""
         data = {
@@ -84,28 +164,64 @@ class SlackService:
         }
         if blocks:
             data["blocks"] = blocks
+        if attachments:
+            data["attachments"] = attachments
 
         return await self._make_request("POST", "chat.postMessage", data)
 
+    async def send_messages(
+        self,
+        messages: list[tuple[str, str, Optional[list]]],
+    ) -> list[Optional[dict]]:
+        """Send many (channel, text, blocks) messages concurrently.
+
+        Channels are served in parallel, at most SEND_CONCURRENCY calls at a
+        time; each channel gets its messages in order, CHANNEL_MESSAGE_INTERVAL
+        apart. Results keep the input order.
+        """
+        results: list[Optional[dict]] = [None] * len(messages)
+        by_channel: defaultdict[str, list[int]] = defaultdict(list)
+        for index, (channel, _, _) in enumerate(messages):
+            by_channel[channel].append(index)
+
+        semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+
+        async def send_channel(indexes: list[int]) -> None:
+            for position, index in enumerate(indexes):
+                if position:
+                    await asyncio.sleep(CHANNEL_MESSAGE_INTERVAL)
+                async with semaphore:
+                    results[index] = await self.send_message(*messages[index])
+
+        await asyncio.gather(*(send_channel(indexes) for indexes in by_channel.values()))
+        return results
+
     async def send_incident_notification(
         self,
         channel: str,
         incident: dict,
+        compact: bool = False,
     ) -> Optional[dict]:
-        """Send formatted incident notification to Slack."""
-        severity_emoji = {
-            "critical": ":rotating_light:",
-            "warning": ":warning:",
-            "info": ":information_source:",
-        }
-        status_color = {
-            "open": "#dc2626",
-            "acknowledged": "#f59e0b",
-            "resolved": "#10b981",
-        }
+        """Send formatted incident notification to Slack.
 
-        emoji = severity_emoji.get(incident.get("severity", "info"), ":bell:")
-        color = status_color.get(incident.get("status", "open"), "#6b7280")
+        With compact=True the incident goes out as one status-coloured
+        attachment without action buttons, about half the payload.
+        """
+        emoji = SEVERITY_EMOJI.get(incident.get("severity", "info"), ":bell:")
+        text = f"{emoji} Incident Alert: {incident.get('title')} ({incident.get('severity')})"
+
+        if compact:
+            attachments = [{
+                "color": STATUS_COLOR.get(incident.get("status", "open"), "#6b7280"),
+                "title": f"{emoji} Incident: {incident.get('title', 'Unknown')}",
+                "fields": [
+                    {"title": "Severity", "value": incident.get("severity", "Unknown").upper(), "short": True},
+                    {"title": "Status", "value": incident.get("status", "Unknown").upper(), "short": True},
+                    {"title": "Started At", "value": incident.get("started_at", "Unknown"), "short": True},
+                    {"title": "ID", "value": f"#{incident.get('id', 'N/A')}", "short": True},
+                ],
+            }]
+            return await self.send_message(channel, text, attachments=attachments)
 
         blocks = [
             {
@@ -150,22 +266,11 @@ class SlackService:
                         "value": f"ack_{incident.get('id')}",
                         "action_id": "acknowledge_incident",
                     },
-                    {
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "View in Able2Flow",
-                            "emoji": True,
-                        },
-                        "url": f"{FRONTEND_URL}/incidents",
-                        "action_id": "view_incident",
-                    },
+                    view_incident_button(),
                 ]
             },
         ]
 
-        text = f"{emoji} Incident Alert: {incident.get('title')} ({incident.get('severity')})"
-
         return await self.send_message(channel, text, blocks)
 
     async def send_task_notification(
@@ -175,13 +280,7 @@ class SlackService:
         event_type: str = "created",
     ) -> Optional[dict]:
         """Send task notification to Slack."""
-        priority_emoji = {
-            "high": ":red_circle:",
-            "medium": ":yellow_circle:",
-            "low": ":white_circle:",
-        }
-
-        emoji = priority_emoji.get(task.get("priority", "medium"), ":blue_circle:")
+        emoji = PRIORITY_EMOJI.get(task.get("priority", "medium"), ":blue_circle:")
 
         blocks = [
             {
@@ -206,12 +305,14 @@ class SlackService:
             },
         ]
 
-        if task.get("description"):
+        description = task.get("description")
+        if description:
+            ellipsis = "..." if len(description) > 200 else ""
             blocks.append({
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": f"*Description:*\n{task['description'][:200]}{'...' if len(task.get('description', '')) > 200 else ''}"
+                    "text": f"*Description:*\n{description[:200]}{ellipsis}"
                 }
             })
 
@@ -321,15 +422,7 @@ class SlackService:
 
     def _get_help_response(self) -> dict:
         """Get help response for slash command."""
-        return {
-            "response_type": "ephemeral",
-            "text": """*Able2Flow Slack Commands:*
-
-• `/able2flow create [task title]` - Create a new task
-• `/able2flow list` - List recent tasks
-• `/able2flow incidents` - List open incidents
-• `/able2flow help` - Show this help message"""
-        }
+        return {"response_type": "ephemeral", "text": HELP_TEXT}
 
     async def unfurl_link(self, url: str) -> Optional[dict]:
         """Generate unfurl data for Able2Flow links."""
@@ -343,24 +436,24 @@ class SlackService:
     async def _unfurl_task(self, url: str) -> Optional[dict]:
         """Generate unfurl for task link."""
         # Extract task ID from URL
-        try:
-            task_id = int(url.split("/tasks/")[-1].split("/")[0].split("?")[0])
-        except (ValueError, IndexError):
+        match = TASK_URL_RE.search(url)
+        if not match:
             return None
 
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-            task = cursor.fetchone()
+        with get_db_readonly() as conn:
+            task = conn.execute(
+                "SELECT title, description, priority, due_date FROM tasks WHERE id = ?",
+                (int(match.group(1)),),
+            ).fetchone()
 
-            if not task:
-                return None
+        if not task:
+            return None
 
-            task_dict = dict(task)
+        task_dict = dict(task)
 
         return {
             "title": task_dict["title"],
-            "text": task_dict.get("description", "")[:200],
+            "text": (task_dict["description"] or "")[:200],
             "color": "#3b82f6",
             "fields": [
                 {"title": "Priority", "value": task_dict.get("priority", "medium"), "short": True},
@@ -370,31 +463,25 @@ class SlackService:
 
     async def _unfurl_incident(self, url: str) -> Optional[dict]:
         """Generate unfurl for incident link."""
-        try:
-            incident_id = int(url.split("/incidents/")[-1].split("/")[0].split("?")[0])
-        except (ValueError, IndexError):
+        match = INCIDENT_URL_RE.search(url)
+        if not match:
             return None
 
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM incidents WHERE id = ?", (incident_id,))
-            incident = cursor.fetchone()
-
-            if not incident:
-                return None
+        with get_db_readonly() as conn:
+            incident = conn.execute(
+                "SELECT title, status, severity FROM incidents WHERE id = ?",
+                (int(match.group(1)),),
+            ).fetchone()
 
-            incident_dict = dict(incident)
+        if not incident:
+            return None
 
-        severity_color = {
-            "critical": "#dc2626",
-            "warning": "#f59e0b",
-            "info": "#3b82f6",
-        }
+        incident_dict = dict(incident)
 
         return {
             "title": f"Incident: {incident_dict['title']}",
             "text": f"Status: {incident_dict['status']}",
-            "color": severity_color.get(incident_dict.get("severity", "info"), "#6b7280"),
+            "color": SEVERITY_COLOR.get(incident_dict.get("severity", "info"), "#6b7280"),
             "fields": [
                 {"title": "Severity", "value": incident_dict.get("severity", "unknown"), "short": True},
                 {"title": "Status", "value": incident_dict.get("status", "unknown"), "short": True},
@@ -0,0 +1,117 @@
+"""Background notification writer for ANT HILL."""
+
+import logging
+import queue
+import sqlite3
+import threading
+
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+INSERT_NOTIFICATION_SQL = """
+    INSERT INTO notifications (user_id, notification_type, title, message, related_task_id)
+    VALUES (?, ?, ?, ?, ?)
+"""
+FLUSH_INTERVAL = 0.1  # seconds a batch may collect before it is written
+FLUSH_BATCH_SIZE = 100
+
+Notification = tuple[str | None, str, str, str, int | None]
+
+
+# Queued by flush() to make the writer thread write what it holds and exit
+_STOP = object()
+
+
+class NotificationQueue:
+    """Queue notifications and insert them in batches from a daemon thread.
+
+    Keeps notification inserts out of hot write transactions (e.g. task
+    completion); they land in the table within ~FLUSH_INTERVAL.
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue[Notification | object] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._written = 0
+
+    def put(
+        self,
+        notification_type: str,
+        title: str,
+        message: str,
+        related_task_id: int | None = None,
+        user_id: str | None = None,
+    ) -> None:
+        """Queue a notification; the writer thread is started on first use."""
+        self._queue.put((user_id, notification_type, title, message, related_task_id))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="notification-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def flush(self) -> int:
+        """Write every queued notification now. Returns the number written.
+
+        Stops the writer thread once it has written the batch it holds, so
+        nothing is left in flight; the next put() starts a new one.
+        """
+        with self._lock:
+            written = self._written
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._stopping.set()
+                self._queue.put(_STOP)
+                thread.join()
+                self._stopping.clear()
+            # Items queued without a running writer
+            while batch := self._drain()[0]:
+                self._write(batch)
+            return self._written - written
+
+    def _drain(self, first: Notification | None = None) -> tuple[list[Notification], bool]:
+        """Take up to FLUSH_BATCH_SIZE queued notifications without blocking.
+
+        Returns the batch and whether the stop marker was reached.
+        """
+        batch = [first] if first else []
+        while len(batch) < FLUSH_BATCH_SIZE:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch: list[Notification]) -> None:
+        try:
+            with get_db() as conn:
+                conn.executemany(INSERT_NOTIFICATION_SQL, batch)
+                conn.commit()
+            self._written += len(batch)
+        except sqlite3.Error:
+            logger.exception("Failed to write %d notifications", len(batch))
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            # Let a burst of notifications accumulate into one transaction;
+            # flush() cuts the wait short
+            self._stopping.wait(FLUSH_INTERVAL)
+            batch, stop = self._drain(first)
+            self._write(batch)
+            if stop:
+                return
+
+
+# Global instance
+notification_queue = NotificationQueue()
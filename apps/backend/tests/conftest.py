@@ -79,6 +79,8 @@ def test_db():
             started_at TEXT DEFAULT CURRENT_TIMESTAMP,
             acknowledged_at TEXT,
             resolved_at TEXT,
+            project_id INTEGER DEFAULT 1,
+            description TEXT,
             FOREIGN KEY (monitor_id) REFERENCES monitors(id)
         )
     """)
@@ -110,7 +112,11 @@ def test_db():
 
     yield db_path
 
-    # Cleanup
+    # Cleanup: drop pooled connections and cached schema of this database
+    from database import close_pools
+    from services.event_store import table_columns
+    close_pools()
+    table_columns.cache_clear()
     os.unlink(db_path)
 
 
@@ -123,3 +129,22 @@ def client(test_db, monkeypatch):
 
     from main import app
     return TestClient(app)
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    """Create a temporary database with the full application schema."""
+    import database
+    import init_db
+    from services.event_store import table_columns
+
+    db_path = tmp_path / "app.db"
+    monkeypatch.setattr(init_db, "DB_PATH", db_path)
+    monkeypatch.setattr(init_db, "SEED_DATA", False)
+    monkeypatch.setattr(database, "DB_PATH", db_path)
+    init_db.init_database()
+
+    yield db_path
+
+    database.close_pools()
+    table_columns.cache_clear()
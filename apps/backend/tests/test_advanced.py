@@ -167,3 +167,170 @@ class TestAIAPI:
         assert "analysis" in data
         assert "runbook" in data
         assert "auto_updated" in data
+
+    def test_parse_ai_response_ignores_trailing_text(self):
+        """Test JSON extraction stops at the end of the first object."""
+        from services.ai_triage_service import ai_triage
+
+        response = {"content": [{"text": (
+            'Here is my analysis:\n{"severity_suggestion": "critical", "confidence": 0.9}\n'
+            "Note: check the {service} config."
+        )}]}
+        result = ai_triage._parse_ai_response(response, {"incident": {"id": 7}})
+
+        assert result["severity_suggestion"] == "critical"
+        assert result["confidence"] == 0.9
+        assert result["incident_id"] == 7
+
+    def test_incident_analysis_stream_fallback(self, client):
+        """Test streaming analysis emits a final result event (no API key)."""
+        create_resp = client.post("/api/incidents", json={
+            "title": "Stream test",
+            "severity": "warning"
+        })
+        incident_id = create_resp.json()["id"]
+
+        response = client.post(f"/api/ai/incidents/{incident_id}/analyze/stream")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: result" in response.text
+        assert "severity_suggestion" in response.text
+
+    @pytest.fixture
+    def claude(self, monkeypatch):
+        """Route Claude API calls to a handler set by the test."""
+        import httpx
+
+        handlers = []
+        async_client = httpx.AsyncClient
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: async_client(
+            transport=httpx.MockTransport(lambda request: handlers[0](request))
+        ))
+        return handlers.append
+
+    def insert_incident(self):
+        from database import get_db
+
+        with get_db() as conn:
+            incident_id = conn.execute(
+                "INSERT INTO incidents (title, severity) VALUES ('Down', 'warning')"
+            ).lastrowid
+            conn.commit()
+        return incident_id
+
+    @pytest.mark.asyncio
+    async def test_incident_analysis_stream_error_event(self, app_db, claude):
+        """Test a Claude error event mid-stream ends with the fallback result."""
+        import httpx
+
+        from services.ai_triage_service import AITriageService
+
+        claude(lambda request: httpx.Response(200, text=(
+            "event: content_block_delta\n"
+            'data: {"type": "content_block_delta", "delta": {"text": "{\\"severity"}}\n\n'
+            "event: error\n"
+            'data: {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}\n\n'
+        )))
+
+        events = [
+            event async for event in
+            AITriageService().analyze_incident_stream(self.insert_incident(), language="cs")
+        ]
+
+        assert [event["type"] for event in events] == ["delta", "result"]
+        analysis = events[-1]["analysis"]
+        assert analysis["fallback"] is True
+        assert analysis["error"] == "overloaded_error: Overloaded"
+        assert analysis["recommended_actions"][0] == "Zkontrolovat logy služby"
+
+    @pytest.mark.asyncio
+    async def test_incident_analysis_error_fallback_language(self, app_db, claude):
+        """Test a failed Claude call falls back in the requested language."""
+        import httpx
+
+        from services.ai_triage_service import AITriageService
+
+        claude(lambda request: httpx.Response(400))
+
+        analysis = await AITriageService().analyze_incident(self.insert_incident(), language="cs")
+
+        assert analysis["fallback"] is True
+        assert analysis["estimated_impact"] == "Neznámé - nutné ruční posouzení"
+
+    @pytest.mark.asyncio
+    async def test_analysis_of_changed_incident_not_joined_to_stale_run(self, app_db):
+        """Test a caller seeing a changed incident doesn't reuse the older analysis."""
+        import asyncio
+
+        from database import get_db
+        from services.ai_triage_service import AITriageService
+
+        with get_db() as conn:
+            conn.execute("INSERT INTO incidents (title) VALUES ('Before')")
+            conn.commit()
+
+        service = AITriageService()
+        release = asyncio.Event()
+        titles = []
+
+        async def analyze(incident_id, language):
+            with get_db() as conn:
+                titles.append(conn.execute(
+                    "SELECT title FROM incidents WHERE id = ?", (incident_id,)
+                ).fetchone()["title"])
+            title = titles[-1]
+            await release.wait()
+            return {"ai_powered": True, "analyzed_at": "", "title": title}
+
+        service._analyze_uncached = analyze
+        first = asyncio.create_task(service.analyze_incident(1))
+        while not titles:
+            await asyncio.sleep(0)
+
+        with get_db() as conn:
+            conn.execute("UPDATE incidents SET title = 'After' WHERE id = 1")
+            conn.commit()
+        second = asyncio.create_task(service.analyze_incident(1))
+        for _ in range(100):
+            if len(titles) == 2:
+                break
+            await asyncio.sleep(0.01)
+        release.set()
+
+        assert (await first)["title"] == "Before"
+        assert (await second)["title"] == "After"
+        assert (await service.analyze_incident(1))["title"] == "After"
+
+
+class TestNotificationQueue:
+    """Test suite for the background notification writer."""
+
+    def test_flush_writes_pending_notification(self, test_db, monkeypatch):
+        """Test flush() right after put() writes the notification."""
+        import sqlite3
+        from pathlib import Path
+
+        import database
+        from services.notification_service import NotificationQueue
+
+        monkeypatch.setattr(database, "DB_PATH", Path(test_db))
+        with sqlite3.connect(test_db) as conn:
+            conn.execute("""
+                CREATE TABLE notifications (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    notification_type TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    related_task_id INTEGER
+                )
+            """)
+
+        notifications = NotificationQueue()
+        notifications.put("points_earned", "Points", "You earned 10 points", 1, "user-1")
+
+        assert notifications.flush() == 1
+        with sqlite3.connect(test_db) as conn:
+            rows = conn.execute("SELECT user_id, title FROM notifications").fetchall()
+        assert rows == [("user-1", "Points")]
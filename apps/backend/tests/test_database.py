@@ -0,0 +1,54 @@
+"""Tests for the pooled database connections."""
+
+import sqlite3
+
+import pytest
+
+import database
+from database import close_pools, get_db, get_db_readonly
+
+
+class TestConnectionPool:
+    """Test suite for database connection pooling."""
+
+    def test_connection_reused(self, app_db):
+        """Test a returned connection is handed out again."""
+        with get_db() as first:
+            pass
+        with get_db() as second:
+            assert second is first
+
+    def test_open_transaction_rolled_back_on_return(self, app_db):
+        """Test uncommitted work is discarded before the connection is reused."""
+        with get_db() as conn:
+            conn.execute("INSERT INTO users (id, name) VALUES ('ant', 'Ant')")
+            assert conn.in_transaction
+
+        with get_db() as reused:
+            assert reused is conn
+            assert not reused.in_transaction
+            assert reused.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+
+    def test_readonly_rejects_writes(self, app_db):
+        """Test read-only connections refuse writes (PRAGMA query_only)."""
+        with get_db_readonly() as conn:
+            with pytest.raises(sqlite3.OperationalError, match="readonly"):
+                conn.execute("INSERT INTO users (id, name) VALUES ('ant', 'Ant')")
+            assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+
+        with get_db() as writer:
+            assert writer is not conn
+
+    def test_close_pools_closes_idle_connections(self, app_db):
+        """Test close_pools closes every idle connection and empties the pools."""
+        with get_db() as writer, get_db_readonly() as reader:
+            pass
+
+        close_pools()
+
+        assert database._pools == {}
+        for conn in (writer, reader):
+            with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+                conn.execute("SELECT 1")
+        with get_db() as conn:
+            assert conn is not writer
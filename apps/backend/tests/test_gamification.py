@@ -0,0 +1,89 @@
+"""Tests for ANT HILL points and the leaderboard read model."""
+
+import init_db
+from database import get_db
+from services.gamification_service import award_points_for_task, get_leaderboard
+from services.notification_service import notification_queue
+
+
+def leaderboard_totals(period_type: str) -> dict[str, int]:
+    return {row["user_id"]: row["total_points"] for row in get_leaderboard(period_type)}
+
+
+def user_points_totals(period_type: str) -> dict[str, int]:
+    with get_db() as conn:
+        rows = conn.execute(
+            """SELECT user_id, SUM(points_earned + bonus_points) AS total
+               FROM user_points WHERE period_type = ? GROUP BY user_id""",
+            (period_type,),
+        ).fetchall()
+    return {row["user_id"]: row["total"] for row in rows}
+
+
+class TestLeaderboardCache:
+    """Test suite for the leaderboard_cache triggers."""
+
+    def award(self, user_id: str, estimated_minutes: int, priority: str = "medium") -> None:
+        with get_db() as conn:
+            task_id = conn.execute(
+                "INSERT INTO tasks (title, estimated_minutes, priority) VALUES ('Task', ?, ?)",
+                (estimated_minutes, priority),
+            ).lastrowid
+            conn.commit()
+        award_points_for_task(task_id, user_id)
+
+    def test_award_points_updates_cache(self, app_db):
+        """Test awarded points reach the leaderboard through the triggers."""
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT INTO users (id, name, email) VALUES (?, ?, ?)",
+                [("ant", "Ant", "ant@example.com"), ("bee", "Bee", "bee@example.com")],
+            )
+            conn.commit()
+
+        self.award("ant", 30)
+        assert leaderboard_totals("weekly") == {"ant": 3}
+
+        self.award("ant", 50, priority="critical")
+        self.award("bee", 20)
+        notification_queue.flush()
+
+        for period_type in ("daily", "weekly", "monthly", "all_time"):
+            assert leaderboard_totals(period_type) == user_points_totals(period_type)
+        assert leaderboard_totals("weekly") == {"ant": 14, "bee": 2}
+        [first, second] = get_leaderboard("weekly")
+        assert (first["rank"], first["user_name"], first["tasks_completed"]) == (1, "Ant", 2)
+        assert (second["rank"], second["user_name"]) == (2, "Bee")
+
+    def test_user_changes_reach_cache(self, app_db):
+        """Test renaming and deleting a user update the cached rows."""
+        with get_db() as conn:
+            conn.execute("INSERT INTO users (id, name) VALUES ('ant', 'Ant')")
+            conn.commit()
+        self.award("ant", 10)
+        notification_queue.flush()
+
+        with get_db() as conn:
+            conn.execute("UPDATE users SET name = 'Queen' WHERE id = 'ant'")
+            conn.commit()
+        assert [row["user_name"] for row in get_leaderboard("weekly")] == ["Queen"]
+
+        with get_db() as conn:
+            conn.execute("DELETE FROM users WHERE id = 'ant'")
+            conn.commit()
+        assert get_leaderboard("weekly") == []
+
+    def test_backfill_rebuilds_missing_rows(self, app_db):
+        """Test init_database backfills cache rows written without the triggers."""
+        with get_db() as conn:
+            conn.execute("INSERT INTO users (id, name) VALUES ('ant', 'Ant')")
+            conn.commit()
+        self.award("ant", 40)
+        notification_queue.flush()
+        with get_db() as conn:
+            conn.execute("DELETE FROM leaderboard_cache")
+            conn.commit()
+
+        init_db.init_database()
+
+        assert leaderboard_totals("weekly") == user_points_totals("weekly") == {"ant": 4}
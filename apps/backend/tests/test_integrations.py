@@ -0,0 +1,432 @@
+"""Tests for the integrations (Calendar, Gmail, batch protocol, Slack)."""
+
+import base64
+import re
+
+import httpx
+import msgspec
+import pytest
+
+from database import get_db
+from services.integrations import calendar_service, gmail_service
+from services.integrations.calendar_service import CalendarService
+from services.integrations.gmail_service import GmailService, decode_body
+from services.integrations.slack_service import SlackService
+from services.integrations.google_api import (
+    MAX_RETRIES,
+    batch_request_body,
+    parse_batch_response,
+)
+
+BATCH_BOUNDARY = "batch_response"
+
+
+def batch_response(parts: list[tuple[int, int, str]], headers: str = "") -> httpx.Response:
+    """200 multipart/mixed response of (content id, status, json body) parts."""
+    body = "".join(
+        f"--{BATCH_BOUNDARY}\r\n"
+        "Content-Type: application/http\r\n"
+        f"Content-ID: <response-item-{index}>\r\n\r\n"
+        f"HTTP/1.1 {status} Status\r\n"
+        f"Content-Type: application/json\r\n{headers}\r\n"
+        f"{payload}\r\n"
+        for index, status, payload in parts
+    ) + f"--{BATCH_BOUNDARY}--\r\n"
+    return httpx.Response(
+        200,
+        headers={"Content-Type": f"multipart/mixed; boundary={BATCH_BOUNDARY}"},
+        text=body,
+    )
+
+
+def batch_parts(request: httpx.Request) -> list[tuple[int, str, str]]:
+    """(content id, method, path) of every part of a batch request."""
+    return [
+        (int(index), method, path)
+        for index, method, path in re.findall(
+            r"Content-ID: <item-(\d+)>\r\n\r\n(\w+) (\S+) HTTP/1.1", request.content.decode()
+        )
+    ]
+
+
+def calendar(monkeypatch, handler) -> CalendarService:
+    """CalendarService whose HTTP calls are answered by `handler`."""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(CalendarService, "client", property(lambda self: client))
+    # No backoff sleeps between retry rounds
+    monkeypatch.setattr(calendar_service, "retry_delay", lambda *args: 0.0)
+    service = CalendarService("user-1")
+    service._access_token = "token"
+    service._headers = {"Authorization": "Bearer token", "Content-Type": "application/json"}
+    return service
+
+
+def insert_task(**fields) -> int:
+    fields.setdefault("title", "Task")
+    with get_db() as conn:
+        cursor = conn.execute(
+            f"INSERT INTO tasks ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+            tuple(fields.values()),
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+
+class TestBatchProtocol:
+    """Test suite for the multipart/mixed batch encoder and decoder."""
+
+    def test_request_body_parts(self):
+        """Test each request becomes an application/http part with its Content-ID."""
+        content_type, body = batch_request_body("/calendar/v3", [
+            ("POST", "/calendars/primary/events", {"summary": "A"}),
+            ("DELETE", "/calendars/primary/events/e1", None),
+        ])
+        boundary = content_type.removeprefix("multipart/mixed; boundary=")
+        parts = body.decode().split(f"--{boundary}")
+
+        assert parts[0] == "" and parts[-1] == "--\r\n"
+        assert "Content-ID: <item-0>" in parts[1]
+        assert "POST /calendar/v3/calendars/primary/events HTTP/1.1" in parts[1]
+        assert parts[1].endswith('\r\n\r\n{"summary":"A"}\r\n')
+        assert "Content-ID: <item-1>" in parts[2]
+        assert "DELETE /calendar/v3/calendars/primary/events/e1 HTTP/1.1" in parts[2]
+
+    def test_content_id_round_trip(self):
+        """Test the Content-IDs of a request map responses back to it."""
+        _, body = batch_request_body("/calendar/v3", [("GET", f"/e/{i}", None) for i in range(3)])
+        request = httpx.Request("POST", "https://example.com/batch", content=body)
+        response = batch_response([
+            (index, 200, f'{{"id": "{path}"}}') for index, _, path in batch_parts(request)
+        ])
+
+        results = parse_batch_response(response.headers["content-type"], response.text, 3)
+
+        assert [r.body["id"] for r in results] == [f"/calendar/v3/e/{i}" for i in range(3)]
+
+    def test_response_statuses(self):
+        """Test 200 JSON, 204, 4xx and 5xx parts, answered out of order."""
+        response = batch_response([
+            (3, 503, '{"error": {"code": 503}}'),
+            (1, 204, ""),
+            (0, 200, '{"id": "e0"}'),
+            (2, 404, '{"error": {"code": 404}}'),
+        ])
+
+        results = parse_batch_response(response.headers["content-type"], response.text, 5)
+
+        assert (results[0].ok, results[0].status, results[0].body) == (True, 200, {"id": "e0"})
+        assert (results[1].ok, results[1].status, results[1].body) == (True, 204, {})
+        assert (results[2].ok, results[2].status) == (False, 404)
+        assert not results[2].retryable
+        assert (results[3].ok, results[3].status) == (False, 503)
+        assert results[3].retryable
+        # No part for the last request
+        assert (results[4].ok, results[4].status) == (False, 0)
+
+    def test_part_retry_after(self):
+        """Test a part's Retry-After header is kept on its result."""
+        response = batch_response([(0, 429, "")], headers="Retry-After: 7\r\n")
+
+        [result] = parse_batch_response(response.headers["content-type"], response.text, 1)
+
+        assert (result.status, result.retry_after) == (429, 7.0)
+
+    @pytest.mark.asyncio
+    async def test_send_batch(self, monkeypatch):
+        """Test _send_batch posts one multipart call and returns per-request results."""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            parts = batch_parts(request)
+            return batch_response([
+                (index, 200 if method == "POST" else 410, '{"id": "new"}')
+                for index, method, _ in reversed(parts)
+            ])
+
+        results = await calendar(monkeypatch, handler)._send_batch([
+            ("PUT", "/calendars/primary/events/gone", {"summary": "A"}),
+            ("POST", "/calendars/primary/events", {"summary": "B"}),
+        ])
+
+        [request] = sent
+        assert str(request.url) == CalendarService.CALENDAR_BATCH_URL
+        assert request.headers["content-type"].startswith("multipart/mixed; boundary=")
+        assert [(r.ok, r.status) for r in results] == [(False, 410), (True, 200)]
+        assert results[1].body == {"id": "new"}
+
+
+class TestCalendarBatchSync:
+    """Test suite for CalendarService.sync_all_tasks."""
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_sent_max_retries_times(self, app_db, monkeypatch):
+        """Test a failing batch call is retried by the sync rounds only."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        insert_task(due_date="2026-03-01T10:00:00+01:00")
+        result = await calendar(monkeypatch, handler).sync_all_tasks()
+
+        assert len(calls) == MAX_RETRIES
+        assert result["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_gone_event_recreated_after_last_retry_round(self, app_db, monkeypatch):
+        """Test an event found deleted in the last round is still re-created."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            [(index, method, _)] = batch_parts(request)
+            if len(calls) < MAX_RETRIES:
+                return batch_response([(index, 503, "")])
+            if method == "PUT":
+                return batch_response([(index, 404, "")])
+            return batch_response([(index, 200, '{"id": "new-event"}')])
+
+        task_id = insert_task(due_date="2026-03-01T10:00:00+01:00", google_event_id="old-event")
+        result = await calendar(monkeypatch, handler).sync_all_tasks()
+
+        assert len(calls) == MAX_RETRIES + 1
+        assert result["synced"] == 1
+        assert result["failed"] == 0
+        with get_db() as conn:
+            row = conn.execute("SELECT google_event_id FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        assert row["google_event_id"] == "new-event"
+
+    @pytest.mark.asyncio
+    async def test_unchanged_tasks_skipped(self, app_db, monkeypatch):
+        """Test tasks are re-sent only when their event payload changes."""
+        sent = []
+
+        def handler(request):
+            parts = batch_parts(request)
+            sent.extend(path.rsplit("/", 1)[-1] for _, _, path in parts)
+            return batch_response([(index, 200, '{"id": "ignored"}') for index, _, _ in parts])
+
+        service = calendar(monkeypatch, handler)
+        first = insert_task(due_date="2026-03-01T10:00:00+01:00", google_event_id="event-1")
+        insert_task(due_date="2026-03-02T10:00:00+01:00", google_event_id="event-2")
+
+        result = await service.sync_all_tasks()
+        assert sorted(sent) == ["event-1", "event-2"]
+        assert (result["updated"], result["unchanged"]) == (2, 0)
+
+        sent.clear()
+        result = await service.sync_all_tasks()
+        assert sent == []
+        assert (result["updated"], result["unchanged"]) == (0, 2)
+
+        # Same wall-clock time in another offset is another instant
+        with get_db() as conn:
+            conn.execute(
+                "UPDATE tasks SET due_date = '2026-03-01T10:00:00+02:00' WHERE id = ?", (first,)
+            )
+            conn.commit()
+        result = await service.sync_all_tasks()
+        assert sent == ["event-1"]
+        assert (result["updated"], result["unchanged"]) == (1, 1)
+
+        sent.clear()
+        with get_db() as conn:
+            conn.execute("UPDATE tasks SET title = 'Renamed' WHERE id = ?", (first,))
+            conn.commit()
+        result = await service.sync_all_tasks()
+        assert sent == ["event-1"]
+        assert (result["updated"], result["unchanged"]) == (1, 1)
+
+
+def sync_token() -> str | None:
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT sync_token FROM calendar_sync_tokens WHERE user_id = 'user-1'"
+        ).fetchone()
+    return row["sync_token"] if row else None
+
+
+def store_sync_token(token: str) -> None:
+    with get_db() as conn:
+        conn.execute(
+            "INSERT INTO calendar_sync_tokens (user_id, calendar_id, sync_token) "
+            "VALUES ('user-1', 'primary', ?)",
+            (token,),
+        )
+        conn.commit()
+
+
+class TestCalendarIncrementalSync:
+    """Test suite for CalendarService.sync_from_calendar."""
+
+    @pytest.mark.asyncio
+    async def test_stored_sync_token_reused(self, app_db, monkeypatch):
+        """Test the stored token is sent and replaced by nextSyncToken."""
+        params = []
+
+        def handler(request):
+            params.append(dict(request.url.params))
+            return httpx.Response(200, json={"items": [], "nextSyncToken": "token-2"})
+
+        store_sync_token("token-1")
+        insert_task(google_event_id="event-1")
+        result = await calendar(monkeypatch, handler).sync_from_calendar()
+
+        assert [p.get("syncToken") for p in params] == ["token-1"]
+        assert result == {"completed": 0, "updated": 0, "checked": 0}
+        assert sync_token() == "token-2"
+
+    @pytest.mark.asyncio
+    async def test_expired_sync_token_falls_back_to_full_listing(self, app_db, monkeypatch):
+        """Test a 410 drops the stored token and lists every event."""
+        params = []
+
+        def handler(request):
+            params.append(dict(request.url.params))
+            if "syncToken" in request.url.params:
+                return httpx.Response(410)
+            return httpx.Response(200, json={
+                "items": [{"id": "event-1", "summary": "[Task] Renamed"}],
+                "nextSyncToken": "token-2",
+            })
+
+        store_sync_token("expired")
+        task_id = insert_task(title="Task", google_event_id="event-1")
+        result = await calendar(monkeypatch, handler).sync_from_calendar()
+
+        assert params[0]["syncToken"] == "expired"
+        assert "syncToken" not in params[1]
+        assert params[1]["showDeleted"] == "true"
+        assert result["updated"] == 1
+        assert sync_token() == "token-2"
+        with get_db() as conn:
+            row = conn.execute("SELECT title FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        assert row["title"] == "Renamed"
+
+    @pytest.mark.asyncio
+    async def test_expired_sync_token_cleared_when_full_listing_fails(self, app_db, monkeypatch):
+        """Test a 410 clears the stored token even if the full listing fails."""
+        def handler(request):
+            return httpx.Response(410 if "syncToken" in request.url.params else 403)
+
+        store_sync_token("expired")
+        result = await calendar(monkeypatch, handler).sync_from_calendar()
+
+        assert result == {"completed": 0, "updated": 0, "checked": 0}
+        assert sync_token() is None
+
+    @pytest.mark.asyncio
+    async def test_cancelled_event_completes_task(self, app_db, monkeypatch):
+        """Test a task whose event was cancelled is completed and moved to Done."""
+        def handler(request):
+            return httpx.Response(200, json={
+                "items": [{"id": "event-1", "status": "cancelled"}],
+                "nextSyncToken": "token-2",
+            })
+
+        with get_db() as conn:
+            conn.execute("INSERT INTO columns (project_id, name, position) VALUES (1, 'To Do', 0)")
+            conn.execute("INSERT INTO columns (project_id, name, position) VALUES (1, 'Done', 1)")
+            conn.commit()
+        store_sync_token("token-1")
+        cancelled_id = insert_task(google_event_id="event-1", column_id=1)
+        unchanged_id = insert_task(google_event_id="event-2", column_id=1)
+        result = await calendar(monkeypatch, handler).sync_from_calendar()
+
+        assert result == {"completed": 1, "updated": 0, "checked": 1}
+        with get_db() as conn:
+            rows = {
+                row["id"]: (row["completed"], row["column_id"])
+                for row in conn.execute("SELECT id, completed, column_id FROM tasks")
+            }
+        assert rows == {cancelled_id: (1, 2), unchanged_id: (0, 1)}
+
+
+def b64url(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+class TestGmailBodies:
+    """Test suite for Gmail message body decoding."""
+
+    @pytest.mark.parametrize("text", ["žluťoučký kůň " * 40, "🦊🐜" * 200, "a" * 500])
+    def test_decode_body_prefix(self, text):
+        """Test cuts at any byte never split a base64 quantum or a UTF-8 sequence."""
+        data = b64url(text)
+        for max_bytes in range(1, 40):
+            body = decode_body(data, max_bytes)
+            assert text.startswith(body)
+            # Everything up to max_bytes, less at most one partial character
+            assert len(body.encode()) >= max_bytes - 3
+
+    def test_decode_body_short_body_whole(self):
+        """Test bodies within max_bytes are decoded whole."""
+        text = "Přílohy: 3 🦊"
+        assert decode_body(b64url(text), len(text.encode())) == text
+        assert decode_body(b64url(text)) == text
+
+    @pytest.mark.asyncio
+    async def test_batch_contents_with_failed_part(self, monkeypatch):
+        """Test a failed part yields None while the others are decoded and cut."""
+        text = "ž" * 100
+        message = {
+            "id": "m0",
+            "payload": {
+                "headers": [{"name": "Subject", "value": "Hello"}],
+                "parts": [
+                    {"mimeType": "text/html", "body": {"data": b64url("<p>html</p>")}},
+                    {"mimeType": "text/plain", "body": {"data": b64url(text)}},
+                ],
+            },
+        }
+
+        def handler(request):
+            [(first, _, _), (second, _, _)] = batch_parts(request)
+            return batch_response([
+                (second, 404, '{"error": {"code": 404}}'),
+                (first, 200, msgspec.json.encode(message).decode()),
+            ])
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(gmail_service, "get_client", lambda: client)
+        service = GmailService("user-1")
+        service._access_token = "token"
+
+        first, missing = await service.batch_get_message_contents(["m0", "gone"], max_body_bytes=15)
+
+        assert missing is None
+        assert (first["id"], first["subject"]) == ("m0", "Hello")
+        assert first["body"] == "ž" * 7
+
+
+class TestSlackPayloads:
+    """Test suite for Slack message payloads."""
+
+    def test_help_response_not_shared(self):
+        """Test changing a help response leaves later ones intact."""
+        service = SlackService()
+        response = service._get_help_response()
+        response["text"] = "changed"
+
+        assert service._get_help_response()["text"].startswith("*Able2Flow Slack Commands:*")
+
+    @pytest.mark.asyncio
+    async def test_incident_buttons_not_shared(self, monkeypatch):
+        """Test each incident notification gets its own button dicts."""
+        sent = []
+
+        async def send_message(channel, text, blocks=None, attachments=None):
+            sent.append(blocks)
+
+        service = SlackService()
+        monkeypatch.setattr(service, "send_message", send_message)
+        incident = {"id": 1, "title": "Down", "severity": "critical", "status": "open"}
+        await service.send_incident_notification("#ops", incident)
+        await service.send_incident_notification("#ops", incident)
+
+        first, second = (blocks[-1]["elements"][-1] for blocks in sent)
+        assert first == second
+        first["text"]["text"] = "changed"
+        assert second["text"]["text"] == "View in Able2Flow"
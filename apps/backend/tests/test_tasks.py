@@ -240,3 +240,41 @@ class TestAuditAPI:
         assert "create" in actions
         assert "update" in actions
         assert "delete" in actions
+
+    def test_bulk_audit_logging(self, client):
+        """Test that bulk-logged actions are stored and decoded like single ones."""
+        from services import audit_service
+
+        created = audit_service.log_actions_bulk([
+            {"entity_type": "task", "entity_id": 1, "action": "create", "new_value": {"title": "A"}},
+            {"entity_type": "task", "entity_id": 1, "action": "update",
+             "old_value": {"title": "A"}, "new_value": {"title": "B"}},
+            {"entity_type": "task", "entity_id": 2, "action": "delete", "old_value": {"title": "C"}},
+        ])
+        assert created == 3
+
+        response = client.get("/api/audit", params={"entity_type": "task", "entity_id": 1})
+        logs = {log["action"]: log for log in response.json()}
+        assert logs["update"]["old_value"] == {"title": "A"}
+        assert logs["update"]["new_value"] == {"title": "B"}
+        assert logs["create"]["old_value"] is None
+
+    def test_audit_log_cursor_pagination(self, client):
+        """Test paging through the audit log with a (timestamp, id) cursor."""
+        from services import audit_service
+
+        audit_service.log_actions_bulk([
+            {"entity_type": "task", "entity_id": i, "action": "create"} for i in range(5)
+        ])
+
+        first_page = client.get("/api/audit", params={"limit": 3}).json()
+        last = first_page[-1]
+        second_page = client.get("/api/audit", params={
+            "limit": 3,
+            "before_timestamp": last["timestamp"],
+            "before_id": last["id"],
+        }).json()
+
+        assert len(first_page) == 3
+        assert len(second_page) == 2
+        assert {log["id"] for log in first_page}.isdisjoint(log["id"] for log in second_page)